@@ -5,6 +5,7 @@ Supports reading model configurations from config files, using aliases to map to
 
 import json
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Optional, Any
 
@@ -20,8 +21,7 @@ class ModelConfigManager:
         """
         if config_path is None:
             # Default config file path
-            default_config = Path(__file__).parent / "model_config.json"
-            config_path = str(default_config)
+            config_path = _default_config_path()
         
         self.config_path = config_path
         self.config = self._load_config()
@@ -177,3 +177,30 @@ class ModelConfigManager:
         
         return model_config.get("type", "gpt")
 
+
+def _default_config_path() -> str:
+    """Default config file path, next to this module"""
+    return str(Path(__file__).parent / "model_config.json")
+
+
+@lru_cache(maxsize=None)
+def _get_cached_config_manager(config_path: str) -> ModelConfigManager:
+    return ModelConfigManager(config_path=config_path)
+
+
+def get_config_manager(config_path: str = None) -> ModelConfigManager:
+    """
+    Get a shared configuration manager for the given config file
+    
+    The config file is parsed once per path and the instance is reused by
+    every caller, so creating several models does not re-read it.
+    
+    Args:
+        config_path: Path to config file, if None then use default path
+        
+    Returns:
+        Shared ModelConfigManager instance
+    """
+    if config_path is None:
+        config_path = _default_config_path()
+    return _get_cached_config_manager(os.path.abspath(config_path))
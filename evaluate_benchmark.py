@@ -7,24 +7,31 @@ import json
 import os
 import re
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Union
 from collections import defaultdict
 from dataclasses import dataclass
 import argparse
+import atexit
 from tqdm import tqdm
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
+import time
 
 try:
     from .prompt_manager import TestModelPromptGenerator, JudgeModelPromptGenerator
-    from .model_apis import BaseModelAPI, ModelFactory
-    from .config_manager import ModelConfigManager
+    from .model_apis import BaseModelAPI, ModelFactory, ResponseCache, create_http_client, prefetch_images
+    from .config_manager import get_config_manager
     from .answer_parser import AnswerParser
+    from .json_io import load_json, dump_json
 except ImportError:
     from prompt_manager import TestModelPromptGenerator, JudgeModelPromptGenerator
-    from model_apis import BaseModelAPI, ModelFactory
-    from config_manager import ModelConfigManager
+    from model_apis import BaseModelAPI, ModelFactory, ResponseCache, create_http_client, prefetch_images
+    from config_manager import get_config_manager
     from answer_parser import AnswerParser
+    from json_io import load_json, dump_json
+
+# Characters that cannot appear in an output folder name
+_MODEL_NAME_SANITIZE = str.maketrans({"/": "_", "\\": "_", ":": "_"})
 
 # ==================== Data Class Definitions ====================
 @dataclass
@@ -56,17 +63,20 @@ class EvaluationResult:
 class BenchmarkDataLoader:
     """Benchmark data loader"""
     
-    def __init__(self, json_path: str, image_base_dir: str = ".", filter_sequence: str = None):
+    def __init__(self, json_path: str, image_base_dir: str = ".", filter_sequence: str = None,
+                 prefetch_workers: int = 0):
         """
         Args:
             json_path: Path to JSON file
             image_base_dir: Base directory for images
             filter_sequence: Filter questions by sequence_view (e.g., "cine" to match all cine sequences)
                             If None, load all questions
+            prefetch_workers: Number of threads used to prefetch images after loading (0 disables)
         """
         self.json_path = json_path
         self.image_base_dir = Path(image_base_dir)
         self.filter_sequence = filter_sequence
+        self.prefetch_workers = prefetch_workers
         
     def load_questions(self) -> List[Question]:
         """Load all questions"""
@@ -74,6 +84,7 @@ class BenchmarkDataLoader:
             data = json.load(f)
         
         questions = []
+        image_base_dir = str(self.image_base_dir)
         for item in data:
             # Filter by sequence_view if filter_sequence is specified
             sequence_view = item.get('sequence_view', '')
@@ -94,33 +105,33 @@ class BenchmarkDataLoader:
             # Try multiple path combinations to handle different directory structures
             full_image_paths = []
             for img_path in images:
-                # Try 1: Direct path (image_base_dir / img_path)
-                full_path = self.image_base_dir / img_path
+                # Remote images are passed through and fetched by the API
+                if str(img_path).startswith(("http://", "https://")):
+                    full_image_paths.append(img_path)
+                    continue
                 
-                # Try 2: If path starts with patient_id, try nested structure
-                # (e.g., if img_path is "1322705/cine_sax_1/..." and base is "dataset/1322705",
-                #  try "dataset/1322705/1322705/cine_sax_1/...")
-                if not full_path.exists() and "/" in str(img_path):
-                    path_parts = str(img_path).split("/", 1)
-                    if len(path_parts) == 2:
-                        potential_patient_id = path_parts[0]
-                        rest_path = path_parts[1]
-                        # Try nested: base_dir / patient_id / rest_path
-                        nested_path = self.image_base_dir / potential_patient_id / rest_path
-                        if nested_path.exists():
-                            full_path = nested_path
+                img_path = str(img_path)
+                
+                # Try 1: Direct path (image_base_dir / img_path)
+                # (this also covers the nested layout, e.g. "1322705/cine_sax_1/..."
+                #  under base "dataset/1322705" -> "dataset/1322705/1322705/cine_sax_1/...")
+                # normpath drops "./" and "//" so each file has one spelling in
+                # warnings and in the path-keyed image caches
+                full_path = os.path.normpath(os.path.join(image_base_dir, img_path))
+                found = os.path.exists(full_path)
                 
-                # Try 3: If still not found, try removing patient_id prefix
-                if not full_path.exists() and "/" in str(img_path):
-                    path_parts = str(img_path).split("/", 1)
-                    if len(path_parts) == 2 and path_parts[0].isdigit():
+                # Try 2: If not found, try removing patient_id prefix
+                if not found and "/" in img_path:
+                    path_parts = img_path.split("/", 1)
+                    if path_parts[0].isdigit():
                         # Remove patient_id prefix and try flat structure
-                        flat_path = self.image_base_dir / path_parts[1]
-                        if flat_path.exists():
+                        flat_path = os.path.normpath(os.path.join(image_base_dir, path_parts[1]))
+                        if os.path.exists(flat_path):
                             full_path = flat_path
+                            found = True
                 
-                if full_path.exists():
-                    full_image_paths.append(str(full_path))
+                if found:
+                    full_image_paths.append(full_path)
                 else:
                     print(f"Warning: Image not found: {full_path}")
             
@@ -142,7 +153,17 @@ class BenchmarkDataLoader:
             )
             questions.append(question)
         
+        if self.prefetch_workers > 0:
+            self.prefetch_images(questions)
+        
         return questions
+    
+    def prefetch_images(self, questions: List[Question]) -> int:
+        """Read and encode question images ahead of evaluation using a thread pool"""
+        image_paths = [img for q in questions for img in q.images]
+        count = prefetch_images(image_paths, max_workers=max(1, self.prefetch_workers))
+        print(f"Prefetched {count} images")
+        return count
 
 # ==================== 答案提取器 ====================
 class AnswerExtractor:
@@ -280,6 +301,70 @@ class AnswerEvaluator:
             is_correct, metrics = AnswerEvaluator.evaluate_single_choice(predicted, ground_truth)
             return is_correct, metrics
 
+# ==================== Concurrency Control ====================
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limiter for API calls
+    
+    Starts at max_limit concurrent calls, halves the limit each time the API
+    reports rate limiting (see throttle()) and adds one back after a run of
+    successful calls. Use one limiter per endpoint.
+    """
+    
+    def __init__(self, max_limit: int, increase_after: int = 10, decrease_interval: float = 1.0):
+        """
+        Args:
+            max_limit: Upper bound on concurrent calls (usually max_workers)
+            increase_after: Consecutive successes required before raising the limit
+            decrease_interval: Minimum seconds between two halvings, so one burst
+                of 429s from concurrent requests counts as a single signal
+        """
+        self.max_limit = max(1, max_limit)
+        self.limit = self.max_limit
+        self.increase_after = increase_after
+        self.decrease_interval = decrease_interval
+        self._in_flight = 0
+        self._successes = 0
+        self._last_decrease = None
+        self._cond = threading.Condition()
+    
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+    
+    def release(self, success: bool = True):
+        with self._cond:
+            self._in_flight -= 1
+            if success:
+                self._successes += 1
+                if self._successes >= self.increase_after and self.limit < self.max_limit:
+                    self._successes = 0
+                    self.limit += 1
+            self._cond.notify_all()
+    
+    def throttle(self):
+        """Record one rate-limited request (used as a model's on_rate_limit callback)"""
+        with self._cond:
+            self._successes = 0
+            now = time.monotonic()
+            if self._last_decrease is not None and now - self._last_decrease < self.decrease_interval:
+                return
+            self._last_decrease = now
+            self.limit = max(1, self.limit // 2)
+    
+    def call(self, func, *args, **kwargs) -> str:
+        """Run a predict-style call under the limiter"""
+        self.acquire()
+        success = False
+        try:
+            output = func(*args, **kwargs)
+            success = not (isinstance(output, str) and output.startswith("Error:"))
+            return output
+        finally:
+            self.release(success)
+
 # ==================== Main Evaluator Class ====================
 class BenchmarkEvaluator:
     """Main benchmark evaluator class"""
@@ -328,8 +413,7 @@ class BenchmarkEvaluator:
             return {}
         
         try:
-            with open(detailed_file, 'r', encoding='utf-8') as f:
-                existing_results = json.load(f)
+            existing_results = load_json(detailed_file)
             # Create a dictionary indexed by qid
             results_dict = {item['qid']: item for item in existing_results}
             print(f"[Resume] Loaded {len(results_dict)} existing results from {detailed_file}")
@@ -361,8 +445,7 @@ class BenchmarkEvaluator:
             # Save detailed results
             detailed_file = self.output_dir / "detailed_results.json"
             self.output_dir.mkdir(parents=True, exist_ok=True)
-            with open(detailed_file, 'w', encoding='utf-8') as f:
-                json.dump(all_results, f, ensure_ascii=False, indent=2)
+            dump_json(all_results, detailed_file)
             
     
     def _update_summary(self, all_results: List[Dict]):
@@ -432,8 +515,7 @@ class BenchmarkEvaluator:
         }
         
         summary_file = self.output_dir / "summary.json"
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, ensure_ascii=False, indent=2)
+        dump_json(summary, summary_file)
     
     def evaluate(self, questions: Optional[List[Question]] = None) -> EvaluationResult:
         """
@@ -732,6 +814,23 @@ class BenchmarkEvaluator:
         detailed_results = []
         completed_lock = threading.Lock()
         
+        # One limiter per endpoint, so throttling at the judge's provider does
+        # not slow down test model calls (and vice versa). Models report each
+        # rate-limited request through their on_rate_limit callback.
+        limiters = {}
+        
+        def _limiter_for(model) -> AdaptiveLimiter:
+            key = (type(model).__name__, getattr(model, 'base_url', None))
+            limiter = limiters.get(key)
+            if limiter is None:
+                limiter = limiters[key] = AdaptiveLimiter(self.max_workers)
+            if isinstance(model, BaseModelAPI):
+                model.on_rate_limit = limiter.throttle
+            return limiter
+        
+        test_limiter = _limiter_for(self.test_model)
+        judge_limiter = _limiter_for(self.judge_model) if self.use_judge and self.judge_model else None
+        
         def process_question(question: Question) -> Optional[Dict]:
             """Process a single question (worker function)"""
             # Skip if already completed and resuming
@@ -752,7 +851,7 @@ class BenchmarkEvaluator:
                 
                 # Model prediction
                 try:
-                    raw_output = self.test_model.predict(question.images, test_prompt)
+                    raw_output = test_limiter.call(self.test_model.predict, question.images, test_prompt)
                 except Exception as e:
                     print(f"[{question.qid}] ERROR: {type(e).__name__}: {e}")
                     raw_output = ""
@@ -777,7 +876,7 @@ class BenchmarkEvaluator:
                     )
                     
                     try:
-                        judge_output = self.judge_model.predict([], judge_prompt)
+                        judge_output = judge_limiter.call(self.judge_model.predict, [], judge_prompt)
                         judgment = self._parse_judge_output(judge_output)
                         is_correct = judgment.get('is_correct', False)
                         if question.is_multiple_choice:
@@ -852,17 +951,26 @@ class BenchmarkEvaluator:
         questions_to_process = [q for q in questions if q.qid not in self.completed_qids]
         
         # Process questions concurrently
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_question = {executor.submit(process_question, q): q for q in questions_to_process}
-            
-            for future in tqdm(as_completed(future_to_question), total=len(questions_to_process), desc="Evaluating"):
-                question = future_to_question[future]
-                try:
-                    result_item = future.result()
-                    if result_item:
-                        detailed_results.append(result_item)
-                except Exception as e:
-                    print(f"[{question.qid}] Future exception: {e}")
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                future_to_question = {executor.submit(process_question, q): q for q in questions_to_process}
+                
+                for future in tqdm(as_completed(future_to_question), total=len(questions_to_process), desc="Evaluating"):
+                    question = future_to_question[future]
+                    try:
+                        result_item = future.result()
+                        if result_item:
+                            detailed_results.append(result_item)
+                    except Exception as e:
+                        print(f"[{question.qid}] Future exception: {e}")
+        finally:
+            for model in (self.test_model, self.judge_model):
+                if isinstance(model, BaseModelAPI):
+                    model.on_rate_limit = None
+        
+        for (model_class, _), limiter in limiters.items():
+            if limiter.limit < limiter.max_limit:
+                print(f"[Concurrent] Rate limiting reduced {model_class} concurrency to {limiter.limit}/{limiter.max_limit}")
         
         # Merge all_results with detailed_results (in case of resume)
         if self.resume and self.output_dir:
@@ -1032,13 +1140,13 @@ class BenchmarkEvaluator:
         # If parsing fails, return default values
         return {'is_correct': False}
     
-    def save_results(self, result: EvaluationResult, output_dir: str, format: str = "json"):
+    def save_results(self, result: EvaluationResult, output_dir: Union[str, Path], format: str = "json"):
         """
         Save evaluation results
         
         Args:
             result: Evaluation result
-            output_dir: Output directory
+            output_dir: Output directory (str or Path)
             format: Output format, "json" or "tsv" (tab-separated), default is JSON only
         """
         output_path = Path(output_dir)
@@ -1046,8 +1154,7 @@ class BenchmarkEvaluator:
         
         # Save detailed results (JSON format)
         detailed_file = output_path / "detailed_results.json"
-        with open(detailed_file, 'w', encoding='utf-8') as f:
-            json.dump(result.detailed_results, f, ensure_ascii=False, indent=2)
+        dump_json(result.detailed_results, detailed_file)
         
         # Save TSV format (if specified)
         if format == "tsv" or format == "both":
@@ -1067,8 +1174,7 @@ class BenchmarkEvaluator:
         }
         
         summary_file = output_path / "summary.json"
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, ensure_ascii=False, indent=2)
+        dump_json(summary, summary_file)
         
         # Generate text report (optional)
         if format == "both":
@@ -1215,14 +1321,30 @@ def main():
                        help='Resume evaluation from existing results (skip already completed questions)')
     parser.add_argument('--max_workers', type=int, default=1,
                        help='Maximum number of concurrent workers for parallel processing (default: 1, sequential)')
+    parser.add_argument('--prefetch_workers', type=int, default=0,
+                       help='Number of threads used to prefetch images before evaluation (default: 0, disabled)')
+    parser.add_argument('--gzip_requests', action='store_true',
+                       help='Gzip large API request bodies (only if the provider accepts Content-Encoding: gzip)')
+    parser.add_argument('--response_cache', type=int, default=0,
+                       help='Answer repeated identical requests (same prompt, images and options) from an in-memory '
+                            'cache of this many responses per model, e.g. judge prompts for identical answers '
+                            '(default: 0, disabled; only meaningful with deterministic sampling such as temperature 0)')
+    parser.add_argument('--breaker_threshold', type=int, default=None,
+                       help='Open a per-endpoint circuit breaker after this many consecutive retryable API failures; '
+                            'while open, requests wait for the cooldown instead of hammering the endpoint '
+                            '(default: disabled)')
     
     args = parser.parse_args()
     
-    # Initialize config manager
-    config_manager = ModelConfigManager(config_path=args.config_path)
+    # Initialize config manager (parsed once, shared by test and judge models)
+    config_manager = get_config_manager(args.config_path)
+    
+    # Shared HTTP connection pool for test and judge models
+    shared_http = create_http_client(args.max_workers, compress_requests=args.gzip_requests or None)
+    atexit.register(shared_http.close)
     
     # Create test model
-    test_model_kwargs = {}
+    test_model_kwargs = {'http_client': shared_http}
     if args.test_api_key:
         test_model_kwargs['api_key'] = args.test_api_key
     if args.test_base_url:
@@ -1247,6 +1369,7 @@ def main():
             'model_type': args.test_model_type,
             'model': args.test_model_name,
             'api_key': args.test_api_key or os.getenv(f"{args.test_model_type.upper()}_API_KEY"),
+            'http_client': shared_http,
         }
         if args.test_base_url:
             test_model_config['base_url'] = args.test_base_url
@@ -1256,11 +1379,15 @@ def main():
     # Create judge model (if specified)
     judge_model = None
     if args.use_judge:
-        judge_model_kwargs = {}
+        judge_model_kwargs = {'http_client': shared_http}
         if args.judge_api_key:
             judge_model_kwargs['api_key'] = args.judge_api_key
         
-        if args.judge_model_alias:
+        if (args.judge_model_alias and args.judge_model_alias == args.test_model_alias
+                and not args.judge_api_key and not args.test_api_key and not args.test_base_url):
+            # Same configured model: reuse the test model instance (and its client)
+            judge_model = test_model
+        elif args.judge_model_alias:
             # Use model alias
             judge_model = ModelFactory.create_model(
                 model_alias=args.judge_model_alias,
@@ -1276,14 +1403,33 @@ def main():
                 'model_type': args.judge_model_type,
                 'model': args.judge_model_name,
                 'api_key': args.judge_api_key or os.getenv(f"{args.judge_model_type.upper()}_API_KEY"),
+                'http_client': shared_http,
             }
             judge_model = ModelFactory.create_from_config(judge_model_config)
     
+    # Optional in-memory response cache (one per model instance)
+    if args.response_cache > 0:
+        test_model.response_cache = ResponseCache(maxsize=args.response_cache)
+        if judge_model is not None and judge_model is not test_model:
+            judge_model.response_cache = ResponseCache(maxsize=args.response_cache)
+    
+    # Optional circuit breaker on the model endpoints
+    if args.breaker_threshold is not None:
+        test_model.breaker_threshold = args.breaker_threshold
+        if judge_model is not None:
+            judge_model.breaker_threshold = args.breaker_threshold
+    
+    # Open API connections in the background while questions are loaded
+    test_model.warmup()
+    if judge_model is not None and judge_model is not test_model:
+        judge_model.warmup()
+    
     # Initialize components
     data_loader = BenchmarkDataLoader(
         args.json_path, 
         args.image_base_dir,
-        filter_sequence=args.filter_sequence
+        filter_sequence=args.filter_sequence,
+        prefetch_workers=args.prefetch_workers
     )
     evaluator = BenchmarkEvaluator(
         data_loader, 
@@ -1299,7 +1445,7 @@ def main():
         # Use default path: Heart_bench/output/{model_name}
         model_name = args.test_model_alias or args.test_model_name or "unknown_model"
         # Clean model name to ensure it can be used as folder name
-        model_name = model_name.replace("/", "_").replace("\\", "_")
+        model_name = model_name.translate(_MODEL_NAME_SANITIZE)
         base_output_dir = Path(__file__).parent / "output"
         output_dir = base_output_dir / model_name
     else:
@@ -1313,7 +1459,7 @@ def main():
     output_dir.mkdir(parents=True, exist_ok=True)
     
     # Update evaluator with output_dir and resume flag
-    evaluator.output_dir = Path(output_dir)
+    evaluator.output_dir = output_dir
     evaluator.resume = args.resume
     
     # Execute evaluation
@@ -1321,7 +1467,7 @@ def main():
     result = evaluator.evaluate()
     
     # Save results (default: JSON format only)
-    evaluator.save_results(result, str(output_dir), format=args.output_format)
+    evaluator.save_results(result, output_dir, format=args.output_format)
     
     # Print summary
     print("\n" + "=" * 80)
@@ -1330,6 +1476,12 @@ def main():
     print(f"Total questions: {result.total}")
     print(f"Correct answers: {result.correct}")
     print(f"Accuracy: {result.accuracy:.4f} ({result.accuracy*100:.2f}%)")
+    if args.response_cache > 0:
+        cache = test_model.response_cache
+        print(f"Test model response cache: {cache.hits} hits, {cache.misses} misses")
+        if judge_model is not None and judge_model is not test_model:
+            cache = judge_model.response_cache
+            print(f"Judge model response cache: {cache.hits} hits, {cache.misses} misses")
     print("=" * 80)
 
 if __name__ == "__main__":
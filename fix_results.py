@@ -3,85 +3,111 @@
 Script to fix incorrect is_correct and accuracy values in detailed_results.json files
 """
 
-import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-def fix_result_item(item):
-    """Fix a single result item"""
+from json_io import load_json, dump_json
+
+def _fix_item(item, log=print):
+    """Fix a single result item in place and report whether it changed"""
+    original_accuracy = item.get('accuracy')
+    accuracy = item.get('accuracy', 0.0)
+    
     # Fix is_correct if it's in legacy format
-    is_correct_raw = item.get('is_correct', False)
+    is_correct_raw = item.get('is_correct')
     if isinstance(is_correct_raw, list) and len(is_correct_raw) > 0:
         # Legacy format: [bool, {accuracy: ...}]
         is_correct = is_correct_raw[0] if isinstance(is_correct_raw[0], bool) else False
-        item['is_correct'] = is_correct
         # Extract accuracy from the dict if present
         if len(is_correct_raw) > 1 and isinstance(is_correct_raw[1], dict):
-            item['accuracy'] = is_correct_raw[1].get('accuracy', 0.0)
+            accuracy = is_correct_raw[1].get('accuracy', 0.0)
+            item['accuracy'] = accuracy
     elif isinstance(is_correct_raw, tuple):
         # Handle tuple format
         is_correct = is_correct_raw[0] if isinstance(is_correct_raw[0], bool) else False
-        item['is_correct'] = is_correct
     else:
         is_correct = bool(is_correct_raw)
+    
+    changed = is_correct_raw != is_correct
+    if is_correct_raw is not is_correct:
         item['is_correct'] = is_correct
     
     # Fix accuracy if it's inconsistent with is_correct
-    accuracy = item.get('accuracy', 0.0)
     if is_correct and accuracy != 1.0:
-        print(f"  Fixing QID {item.get('qid', 'unknown')}: is_correct=True but accuracy={accuracy}, setting to 1.0")
-        item['accuracy'] = 1.0
+        log(f"  Fixing QID {item.get('qid', 'unknown')}: is_correct=True but accuracy={accuracy}, setting to 1.0")
+        accuracy = item['accuracy'] = 1.0
     elif not is_correct and accuracy != 0.0:
-        print(f"  Fixing QID {item.get('qid', 'unknown')}: is_correct=False but accuracy={accuracy}, setting to 0.0")
-        item['accuracy'] = 0.0
+        log(f"  Fixing QID {item.get('qid', 'unknown')}: is_correct=False but accuracy={accuracy}, setting to 0.0")
+        accuracy = item['accuracy'] = 0.0
     
+    if 'accuracy' in item and original_accuracy != accuracy:
+        changed = True
+    return changed
+
+def fix_result_item(item, log=print):
+    """Fix a single result item"""
+    _fix_item(item, log)
     return item
 
-def fix_results_file(json_file_path):
+def fix_results_file(json_file_path, log=print):
     """Fix a detailed_results.json file"""
     json_file = Path(json_file_path)
     if not json_file.exists():
-        print(f"Error: File not found: {json_file_path}")
+        log(f"Error: File not found: {json_file_path}")
         return False
     
-    print(f"Fixing: {json_file_path}")
+    log(f"Fixing: {json_file_path}")
     
     try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            results = json.load(f)
+        results = load_json(json_file)
         
-        fixed_count = 0
-        for item in results:
-            original_is_correct = item.get('is_correct')
-            original_accuracy = item.get('accuracy')
-            
-            fixed_item = fix_result_item(item)
-            
-            if (original_is_correct != fixed_item.get('is_correct') or 
-                original_accuracy != fixed_item.get('accuracy')):
-                fixed_count += 1
+        fixed_count = sum(_fix_item(item, log) for item in results)
         
-        # Save fixed results
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        if fixed_count == 0:
+            log("  No changes")
+            return True
         
-        print(f"  Fixed {fixed_count} items")
+        # Save fixed results atomically: write a temp file, then swap it in
+        tmp_file = json_file.with_suffix(".json.tmp")
+        dump_json(results, tmp_file)
+        os.replace(tmp_file, json_file)
+        
+        log(f"  Fixed {fixed_count} items")
         return True
         
     except Exception as e:
-        print(f"  Error: {e}")
+        log(f"  Error: {e}")
         return False
 
+def _fix_results_file_buffered(json_file_path):
+    """Worker entry point: fix one file and return its log lines instead of printing them"""
+    lines = []
+    success = fix_results_file(json_file_path, log=lines.append)
+    return success, lines
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python3 fix_results.py <detailed_results.json> [<detailed_results.json> ...]")
         print("Example: python3 fix_results.py ../output/qwen3-vl-235b/51622052/detailed_results.json")
         sys.exit(1)
     
+    json_files = sys.argv[1:]
     success_count = 0
-    for json_file in sys.argv[1:]:
-        if fix_results_file(json_file):
+    if len(json_files) == 1:
+        if fix_results_file(json_files[0]):
             success_count += 1
+    else:
+        # Files are independent, so fan them out across processes.
+        # Each worker buffers its log lines so output is not interleaved.
+        max_workers = min(len(json_files), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            for success, lines in pool.map(_fix_results_file_buffered, json_files):
+                for line in lines:
+                    print(line)
+                if success:
+                    success_count += 1
     
-    print(f"\nFixed {success_count}/{len(sys.argv)-1} file(s)")
+    print(f"\nFixed {success_count}/{len(json_files)} file(s)")
 
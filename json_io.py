@@ -0,0 +1,77 @@
+"""
+JSON file helpers shared by the evaluation scripts
+Use orjson when it is installed, without changing what is read or written
+"""
+
+import json
+import math
+from pathlib import Path
+from typing import Any, Union
+
+# Optional fast JSON codec
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _has_non_finite(data: Any) -> bool:
+    """Whether data contains a NaN or infinite float anywhere"""
+    stack = [data]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, float):
+            if not math.isfinite(obj):
+                return True
+        elif isinstance(obj, dict):
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+    return False
+
+def load_json(json_file: Union[str, Path]) -> Any:
+    """
+    Load a JSON file, using orjson when available
+    
+    orjson rejects the NaN/Infinity tokens that json.dump writes, so such
+    files are parsed again with the stdlib decoder.
+    
+    Args:
+        json_file: Path to the JSON file
+    
+    Returns:
+        Parsed JSON data
+    """
+    json_file = Path(json_file)
+    if orjson is not None:
+        data = json_file.read_bytes()
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return json.loads(data)
+    with open(json_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def dump_json(data: Any, json_file: Union[str, Path]):
+    """
+    Write JSON with 2-space indent, using orjson when available
+    
+    The output reads back the same as json.dump(ensure_ascii=False, indent=2):
+    data holding NaN/Infinity (which orjson would write as null) or values
+    orjson cannot encode (e.g. integers wider than 64 bits) go through the
+    stdlib encoder.
+    
+    Args:
+        data: JSON-serialisable data
+        json_file: Path to the output file
+    """
+    json_file = Path(json_file)
+    if orjson is not None and not _has_non_finite(data):
+        try:
+            encoded = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            encoded = None
+        if encoded is not None:
+            json_file.write_bytes(encoded)
+            return
+    with open(json_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
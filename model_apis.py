@@ -4,39 +4,540 @@ Supports different models such as GPT and Qwen
 """
 
 import os
+import re
+import sys
+import asyncio
+import atexit
 import base64
+import gzip
+import hashlib
 import json
+import mmap
+import random
+import threading
 import time
-from typing import List, Dict, Optional, Union
+from functools import lru_cache, partial
+from typing import List, Dict, Optional, Tuple, Union
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import requests
-from openai import OpenAI
-from openai import RateLimitError, APIError
 
-# Optional imports for Qwen
-try:
-    from qwen_vl_utils import process_vision_info
-except ImportError:
-    process_vision_info = None
+# The openai and dashscope SDKs are slow to import, so they are loaded on
+# first use; a process that only uses one backend never imports the other.
+def _lazy_openai():
+    """Import and return the openai module"""
+    import openai
+    return openai
 
-try:
+def _lazy_multimodal_conversation():
+    """Import and return dashscope's MultiModalConversation (optional dependency for Qwen)"""
     from dashscope import MultiModalConversation
+    return MultiModalConversation
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    """Whether error is an openai RateLimitError (without importing openai if it is not loaded)"""
+    openai = sys.modules.get('openai')
+    return openai is not None and isinstance(error, openai.RateLimitError)
+
+# Optional SIMD base64 encoder (same API as the stdlib module)
+try:
+    import pybase64 as _b64
 except ImportError:
-    MultiModalConversation = None
+    _b64 = base64
+
+# ==================== Image Encoding ====================
+# Number of encoded images kept in memory (override with HEARTBENCH_IMG_CACHE)
+_IMG_CACHE_SIZE = int(os.getenv("HEARTBENCH_IMG_CACHE", "512"))
+
+# Read size for streaming encode; a multiple of 3 so chunks need no padding
+_B64_CHUNK_SIZE = 48 * 1024
+
+# Files larger than this are memory-mapped instead of read in chunks
+_MMAP_THRESHOLD = 512 * 1024
+
+_MIME_MAP = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp'
+}
+
+# Data URL headers for each supported mime type, built once
+_DATA_URL_PREFIXES = {
+    mime_type: f"data:{mime_type};base64,".encode('ascii')
+    for mime_type in set(_MIME_MAP.values())
+}
+
+# Images given as URLs are passed to the API as-is instead of being encoded
+_REMOTE_IMAGE_PREFIXES = ("http://", "https://")
+
+# Optional on-disk cache of encoded images shared across runs (set HEARTBENCH_B64_DIR)
+_B64_CACHE_DIR = os.getenv("HEARTBENCH_B64_DIR")
+
+def _sniff_mime_type(head: bytes, image_path: str) -> str:
+    """Detect the image mime type from its magic bytes, falling back to the file extension"""
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return 'image/png'
+    if head.startswith(b"\xff\xd8\xff"):
+        return 'image/jpeg'
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return 'image/gif'
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return 'image/webp'
+    return _MIME_MAP.get(os.path.splitext(image_path)[1].lower(), 'image/png')
+
+def _new_data_url_buffer(mime_type: str, size: int):
+    """Preallocate a buffer for a data URL of a size-byte file; returns (buffer, write position)"""
+    prefix = _DATA_URL_PREFIXES.get(mime_type) or f"data:{mime_type};base64,".encode('ascii')
+    out = bytearray(len(prefix) + 4 * ((size + 2) // 3))
+    out[:len(prefix)] = prefix
+    return out, len(prefix)
+
+def _encode_file_data_url(image_path: str, size: int) -> str:
+    """Read an image file and encode it as a base64 data URL"""
+    # Encode chunk by chunk into one preallocated buffer, so the whole raw
+    # file and intermediate base64 copies are never held at the same time
+    with open(image_path, 'rb') as f:
+        if size > _MMAP_THRESHOLD:
+            # Large files: encode straight from the page cache without read() copies
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                out, pos = _new_data_url_buffer(_sniff_mime_type(mm[:12], image_path), size)
+                view = memoryview(mm)
+                try:
+                    for start in range(0, len(mm), _B64_CHUNK_SIZE):
+                        encoded = _b64.b64encode(view[start:start + _B64_CHUNK_SIZE])
+                        out[pos:pos + len(encoded)] = encoded
+                        pos += len(encoded)
+                finally:
+                    view.release()
+        else:
+            chunk = f.read(_B64_CHUNK_SIZE)
+            out, pos = _new_data_url_buffer(_sniff_mime_type(chunk[:12], image_path), size)
+            while chunk:
+                encoded = _b64.b64encode(chunk)
+                out[pos:pos + len(encoded)] = encoded
+                pos += len(encoded)
+                chunk = f.read(_B64_CHUNK_SIZE)
+    return str(memoryview(out)[:pos], 'ascii')
+
+def _disk_cache_file(image_path: str, mtime_ns: int, size: int) -> Optional[Path]:
+    """Sidecar file holding the encoded image, or None if the disk cache is disabled"""
+    if not _B64_CACHE_DIR:
+        return None
+    key = f"{os.path.realpath(image_path)}:{mtime_ns}:{size}"
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return Path(_B64_CACHE_DIR).expanduser() / digest[:2] / f"{digest}.b64"
+
+@lru_cache(maxsize=_IMG_CACHE_SIZE)
+def _encode_image_data_url(image_path: str, mtime_ns: int, size: int) -> str:
+    """
+    Return an image file as a base64 data URL
+    
+    Questions on the same series share the same image files, so the
+    encoded payload is cached instead of re-read for every question.
+    mtime_ns and size are part of the key so a changed file is re-read.
+    The caller's os.stat() result supplies them, so there is one stat per image.
+    """
+    cache_file = _disk_cache_file(image_path, mtime_ns, size)
+    if cache_file is not None:
+        try:
+            return cache_file.read_text(encoding='ascii')
+        except OSError:
+            pass
+    
+    data_url = _encode_file_data_url(image_path, size)
+    
+    if cache_file is not None:
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_file.write_text(data_url, encoding='ascii')
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            print(f"Warning: Failed to write image cache {cache_file}: {e}")
+    return data_url
+
+def _is_remote_image(image_path) -> bool:
+    """Whether the image is an http(s) URL the API can fetch directly"""
+    return isinstance(image_path, str) and image_path.startswith(_REMOTE_IMAGE_PREFIXES)
+
+@lru_cache(maxsize=4096)
+def _cached_image_exists(image_path: str) -> bool:
+    # Raising on a miss keeps it out of the cache (lru_cache only stores returned values)
+    if not os.path.exists(image_path):
+        raise FileNotFoundError(image_path)
+    return True
+
+def _image_exists(image_path: str) -> bool:
+    """Existence check for image paths reused across prompts (only hits are cached, so late files are found)"""
+    try:
+        return _cached_image_exists(image_path)
+    except FileNotFoundError:
+        return False
+
+def _load_image_data_url(image_path: str) -> str:
+    """Return the (cached) base64 data URL for an image file"""
+    image_path = str(image_path)
+    st = os.stat(image_path)
+    return _encode_image_data_url(image_path, st.st_mtime_ns, st.st_size)
+
+def prefetch_images(image_paths: List[str], max_workers: int = 32) -> int:
+    """
+    Read and encode images concurrently to warm the encoding cache
+    
+    Only as many unique paths as the cache can hold are prefetched, in
+    the order given, so the first questions start with their images ready.
+    
+    Args:
+        image_paths: Image paths in evaluation order (duplicates allowed)
+        max_workers: Number of reader threads
+        
+    Returns:
+        Number of images prefetched
+    """
+    unique_paths = list(dict.fromkeys(str(p) for p in image_paths if not _is_remote_image(str(p))))
+    unique_paths = unique_paths[:_encode_image_data_url.cache_info().maxsize]
+    
+    def _load(path):
+        try:
+            _load_image_data_url(path)
+            return True
+        except OSError:
+            return False
+    
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        return sum(executor.map(_load, unique_paths))
+
+# Shared thread pool for reading/encoding the images of one request concurrently
+_IO_POOL_WORKERS = 8
+_io_pool = None
+_io_pool_lock = threading.Lock()
+
+def _get_io_pool():
+    """Lazily created module-wide image I/O thread pool"""
+    global _io_pool
+    if _io_pool is None:
+        with _io_pool_lock:
+            if _io_pool is None:
+                _io_pool = ThreadPoolExecutor(max_workers=_IO_POOL_WORKERS, thread_name_prefix="image-io")
+    return _io_pool
+
+# ==================== Prompt Classification ====================
+# A prompt is treated as a complete system prompt (Ksyun) if it contains any
+# of these markers, contains both of the paired markers, or starts with the prefix
+_SYS_PROMPT_MARKERS = ("Vision-Language Model", "Strict rules")
+_SYS_PROMPT_REQUIRED_PAIR = ("Task:", "Options:")
+_SYS_PROMPT_PREFIX = "You are"
+_SYS_PROMPT_RE = re.compile("|".join(
+    re.escape(marker) for marker in _SYS_PROMPT_MARKERS + _SYS_PROMPT_REQUIRED_PAIR
+))
+
+def _is_system_prompt(prompt: str) -> bool:
+    """Classify a prompt with a single regex scan instead of one scan per marker"""
+    if prompt.lstrip().startswith(_SYS_PROMPT_PREFIX):
+        return True
+    seen_pair = set()
+    for match in _SYS_PROMPT_RE.finditer(prompt):
+        marker = match.group()
+        if marker in _SYS_PROMPT_MARKERS:
+            return True
+        seen_pair.add(marker)
+        if len(seen_pair) == len(_SYS_PROMPT_REQUIRED_PAIR):
+            return True
+    return False
+
+# ==================== Response Cache ====================
+@lru_cache(maxsize=4096)
+def _image_digest(image_path: str, mtime_ns: int, size: int) -> bytes:
+    """Content hash of an image file (keyed by path/mtime/size so unchanged files are hashed once)"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(image_path, 'rb') as f:
+        for chunk in iter(partial(f.read, 1024 * 1024), b''):
+            h.update(chunk)
+    return h.digest()
+
+def _image_cache_token(image_path) -> bytes:
+    """Identity of one image for response cache keys: content hash, URL, or a missing marker"""
+    image_path = str(image_path)
+    if _is_remote_image(image_path):
+        return image_path.encode('utf-8')
+    try:
+        st = os.stat(image_path)
+    except OSError:
+        return b'missing:' + image_path.encode('utf-8')
+    return _image_digest(image_path, st.st_mtime_ns, st.st_size)
+
+class ResponseCache:
+    """
+    Thread-safe in-memory LRU cache of model completions
+    
+    Maps (model, prompt, image contents, call options) to the returned text,
+    so repeating an identical request skips the API call entirely. Images
+    are identified by a hash of their bytes, so the same image under a
+    different path still hits. Error strings are never stored.
+    
+    Opt-in: assign an instance to a model's response_cache attribute.
+    """
+    
+    def __init__(self, maxsize: int = 4096):
+        """
+        Args:
+            maxsize: Maximum number of cached completions
+        """
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def make_key(model: str, prompt: str, images: List[str], options: Dict = None) -> bytes:
+        """
+        Build the cache key for one request
+        
+        Args:
+            model: Model name
+            prompt: Prompt text
+            images: Image paths or URLs, in request order
+            options: Other call options that affect the output (e.g. temperature)
+            
+        Returns:
+            Binary digest identifying the request
+        """
+        h = hashlib.blake2b(digest_size=20)
+        h.update(str(model).encode('utf-8'))
+        h.update(b'\0')
+        h.update((prompt or '').encode('utf-8'))
+        for img in images or ():
+            h.update(b'\0')
+            h.update(_image_cache_token(img))
+        if options:
+            h.update(b'\0')
+            h.update(repr(sorted(options.items())).encode('utf-8'))
+        return h.digest()
+    
+    def get(self, key: bytes) -> Optional[str]:
+        """Return the cached completion for key, or None"""
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key: bytes, value: str):
+        """Store a completion (empty replies and error strings are ignored)"""
+        if not isinstance(value, str) or not value or value.startswith("Error:"):
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def clear(self):
+        """Drop all cached completions"""
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
+# ==================== Retry Support ====================
+_RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+class ResponseStatusError(Exception):
+    """Non-success status returned in a response object (rather than raised by the SDK)"""
+    
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+
+class CircuitBreaker:
+    """
+    Pause all callers after sustained provider failures
+    
+    Counts consecutive retryable failures (rate limits, timeouts, 5xx).
+    Once `threshold` is reached the breaker opens for an exponentially
+    growing cool-down (capped at `max_cooldown` seconds), during which
+    callers wait instead of contacting the provider. Any success closes it.
+    """
+    
+    def __init__(self, threshold: int = 5, max_cooldown: float = 60.0):
+        """
+        Args:
+            threshold: Consecutive failures that open the breaker
+            max_cooldown: Longest time the breaker stays open, in seconds
+        """
+        self.threshold = threshold
+        self.max_cooldown = max_cooldown
+        self.failures = 0
+        self.open_until = 0.0
+        self.last_error = None
+        self._lock = threading.Lock()
+    
+    def remaining(self) -> float:
+        """Seconds until the breaker closes again (0 when closed)"""
+        return max(0.0, self.open_until - time.monotonic())
+    
+    def record_success(self):
+        """Close the breaker and reset the failure count"""
+        if self.failures:
+            with self._lock:
+                self.failures = 0
+                self.open_until = 0.0
+    
+    def record_failure(self, error: Exception) -> bool:
+        """
+        Count a retryable failure
+        
+        Returns:
+            True if this failure opened the breaker
+        """
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+            if self.failures < self.threshold:
+                return False
+            self.open_until = time.monotonic() + min(self.max_cooldown, 2 ** self.failures)
+            return True
+
+# ==================== Shared HTTP Client ====================
+_default_http_client = None
+_default_http_client_lock = threading.Lock()
+
+# Request bodies at least this large are gzipped when compression is enabled
+_GZIP_MIN_BYTES = 64 * 1024
+
+class _GzipTransport:
+    """httpx transport wrapper: gzip large request bodies (Content-Encoding: gzip)"""
+    
+    def __init__(self, transport):
+        """
+        Args:
+            transport: httpx transport that sends the (possibly compressed) request
+        """
+        self._transport = transport
+    
+    def handle_request(self, request):
+        import httpx
+        body = request.read()
+        if 'Content-Encoding' not in request.headers and len(body) >= _GZIP_MIN_BYTES:
+            compressed = gzip.compress(body, compresslevel=1)
+            headers = request.headers.copy()
+            headers['Content-Encoding'] = 'gzip'
+            headers['Content-Length'] = str(len(compressed))
+            request = httpx.Request(request.method, request.url, headers=headers,
+                                    content=compressed, extensions=request.extensions)
+        return self._transport.handle_request(request)
+    
+    def close(self):
+        self._transport.close()
+    
+    def __enter__(self):
+        self._transport.__enter__()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._transport.__exit__(*exc_info)
+
+def create_http_client(max_workers: int = 1, timeout: float = 600.0, compress_requests: bool = None):
+    """
+    Create an httpx.Client with a connection pool sized for max_workers
+    
+    Passing the same client to several models lets them reuse keep-alive
+    connections instead of opening a new TLS session per model. HTTP/2 is
+    enabled when the optional h2 package is installed.
+    
+    Args:
+        max_workers: Number of concurrent workers that will share the client
+        timeout: Read timeout in seconds (connect timeout is 5s)
+        compress_requests: Gzip request bodies over 64 KiB (base64 image payloads).
+            Only enable for providers that accept gzip-encoded requests.
+            If None, enabled when HEARTBENCH_GZIP_REQUESTS=1
+        
+    Returns:
+        httpx.Client instance (caller is responsible for closing it)
+    """
+    import httpx
+    try:
+        import h2  # noqa: F401
+        http2 = True
+    except ImportError:
+        http2 = False
+    
+    if compress_requests is None:
+        compress_requests = os.getenv("HEARTBENCH_GZIP_REQUESTS") == "1"
+    
+    max_workers = max(1, max_workers)
+    limits = httpx.Limits(
+        max_connections=max_workers * 2,
+        max_keepalive_connections=max_workers,
+        keepalive_expiry=60.0
+    )
+    transport = None
+    if compress_requests:
+        transport = _GzipTransport(httpx.HTTPTransport(http2=http2, limits=limits))
+    return httpx.Client(
+        http2=http2,
+        timeout=httpx.Timeout(timeout, connect=5.0),
+        limits=limits,
+        transport=transport
+    )
+
+def _get_http_client():
+    """Process-wide pooled httpx.Client used by models created without one"""
+    global _default_http_client
+    if _default_http_client is None:
+        with _default_http_client_lock:
+            if _default_http_client is None:
+                _default_http_client = create_http_client(max_workers=32)
+                atexit.register(_default_http_client.close)
+    return _default_http_client
 
 # ==================== Base Model Interface ====================
 class BaseModelAPI(ABC):
     """Base model API class"""
     
-    def __init__(self, api_key: str = None, base_url: str = None):
+    __slots__ = ("api_key", "base_url", "dedupe_images", "response_cache", "on_rate_limit",
+                 "breaker_threshold")
+    
+    # Retry policy used by _retry_call
+    max_retries = 3
+    retry_delay = 1  # Initial delay in seconds
+    max_retry_delay = 30  # Upper bound for a single wait, in seconds
+    retry_jitter = 0.5  # Random +/- fraction applied to the backoff delay
+    retryable_errors = ('APIConnectionError', 'APITimeoutError', 'InternalServerError')
+    
+    # Circuit breakers shared by all instances talking to the same endpoint
+    # (enabled per instance through breaker_threshold)
+    breaker_max_cooldown = 60.0
+    _breakers = {}
+    _breakers_lock = threading.Lock()
+    
+    def __init__(self, api_key: str = None, base_url: str = None, breaker_threshold: int = None):
         """
         Args:
             api_key: API key
             base_url: API base URL (optional)
+            breaker_threshold: Consecutive retryable failures that open the endpoint's
+                circuit breaker (optional, default None = disabled)
         """
         self.api_key = api_key or os.getenv("API_KEY")
         self.base_url = base_url
+        self.breaker_threshold = breaker_threshold
+        # Drop repeated images (same path or identical bytes) within one request.
+        # Off by default so the model sees exactly the images listed in the question.
+        self.dedupe_images = False
+        # Optional ResponseCache; identical requests are answered from it
+        self.response_cache = None
+        # Optional zero-argument callback run on every rate-limited request (including retried ones)
+        self.on_rate_limit = None
     
     @abstractmethod
     def predict(self, 
@@ -56,25 +557,366 @@ class BaseModelAPI(ABC):
         """
         pass
     
+    async def apredict(self,
+                       images: List[str],
+                       prompt: str,
+                       **kwargs) -> str:
+        """
+        Awaitable wrapper around predict()
+        
+        The blocking call runs in the event loop's default thread pool, so
+        callers can asyncio.gather() many predictions while reusing the same
+        retry logic and pooled HTTP client as predict().
+        
+        Args:
+            images: List of image paths
+            prompt: Prompt text
+            **kwargs: Other parameters passed to predict()
+            
+        Returns:
+            Model output answer text
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(self.predict, images, prompt, **kwargs))
+    
+    def predict_batch(self,
+                      inputs: List[Tuple[List[str], str]],
+                      max_workers: int = 8,
+                      **kwargs) -> List[str]:
+        """
+        Run several predictions concurrently
+        
+        API calls are network-bound, so a thread pool overlaps their latency.
+        Results are returned in the same order as inputs. predict() reports
+        API failures as "Error: ..." strings; any exception it raises for an
+        item is re-raised here after the other items have finished.
+        
+        Args:
+            inputs: List of (images, prompt) pairs
+            max_workers: Maximum number of concurrent requests
+            **kwargs: Other parameters passed to every predict() call
+            
+        Returns:
+            List of model output texts
+        """
+        if not inputs:
+            return []
+        
+        def _predict(item):
+            images, prompt = item
+            return self.predict(images, prompt, **kwargs)
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(inputs)))) as executor:
+            return list(executor.map(_predict, inputs))
+    
+    def prepare_content(self, images: List[str]) -> List[Dict]:
+        """
+        Build OpenAI-style image_url content blocks for a list of images
+        
+        Local files become base64 data URLs (served from the encoding cache),
+        http(s) URLs are passed through, and missing files are skipped with
+        a warning. Callers add their text block around the result.
+        
+        Args:
+            images: List of image paths or URLs
+            
+        Returns:
+            List of {"type": "image_url", ...} content blocks
+        """
+        if len(images) > 1:
+            # Read/encode cache misses in parallel; map() keeps image order
+            data_urls = list(_get_io_pool().map(self._load_image_data_url_or_none, images))
+        else:
+            data_urls = [self._load_image_data_url_or_none(img_path) for img_path in images]
+        
+        blocks = []
+        seen_urls = set()
+        for img_path, data_url in zip(images, data_urls):
+            if data_url is None:
+                print(f"Warning: Image not found: {img_path}")
+                continue
+            if self.dedupe_images:
+                # Identical files encode to identical URLs
+                if data_url in seen_urls:
+                    continue
+                seen_urls.add(data_url)
+            
+            blocks.append({
+                "type": "image_url",
+                "image_url": {
+                    "url": data_url
+                }
+            })
+        return blocks
+    
+    def _load_image_data_url_or_none(self, image_path: str) -> Optional[str]:
+        """Data URL for an image, or None if the file does not exist"""
+        try:
+            return self._load_image_data_url(image_path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+    
+    def _retry_wait(self, attempt: int, error: Exception) -> float:
+        """
+        Seconds to wait before retrying after error on the given attempt
+        
+        Honors a numeric Retry-After header from the server; otherwise uses
+        exponential backoff with random jitter so concurrent workers do not
+        retry in lockstep. Both are capped at max_retry_delay.
+        """
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None)
+        if headers is not None:
+            try:
+                retry_after = float(headers.get('retry-after'))
+            except (TypeError, ValueError):
+                retry_after = None
+            if retry_after is not None and retry_after >= 0:
+                return min(self.max_retry_delay, retry_after)
+        
+        delay = self.retry_delay * (2 ** attempt)
+        delay *= 1 + random.uniform(-self.retry_jitter, self.retry_jitter)
+        return min(self.max_retry_delay, delay)
+    
+    def _report_rate_limit(self):
+        """Notify the on_rate_limit callback (if any) about one throttled request"""
+        callback = self.on_rate_limit
+        if callback is not None:
+            callback()
+    
+    def _response_cache_key(self, images: List[str], prompt: str, options: Dict) -> Optional[bytes]:
+        """
+        Response cache key for a predict() call
+        
+        Args:
+            images: Image paths
+            prompt: Prompt text
+            options: Remaining predict() arguments; use_cache=False disables caching for the call
+            
+        Returns:
+            Cache key, or None when caching is off
+        """
+        if self.response_cache is None or options.get('use_cache', True) is False:
+            return None
+        options = {k: v for k, v in options.items() if k != 'use_cache'}
+        return ResponseCache.make_key(getattr(self, 'model', ''), prompt, images, options)
+    
+    def _get_breaker(self) -> Optional[CircuitBreaker]:
+        """Circuit breaker for this model's endpoint (shared across instances), or None when disabled"""
+        if self.breaker_threshold is None:
+            return None
+        key = (type(self).__name__, self.base_url, self.breaker_threshold)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._breakers_lock:
+                breaker = self._breakers.get(key)
+                if breaker is None:
+                    breaker = CircuitBreaker(self.breaker_threshold, self.breaker_max_cooldown)
+                    self._breakers[key] = breaker
+        return breaker
+    
+    def _retry_call(self, call, label: str, cache_key: bytes = None) -> str:
+        """
+        Run an API call with the shared retry policy
+        
+        Retryable failures (rate limits, connection/timeout errors and
+        429/5xx status codes) are retried with jittered exponential backoff,
+        or after the server's Retry-After delay when one is given.
+        Once retries are exhausted, or for any other error, an
+        "Error: ..." string is returned instead of raising.
+        When breaker_threshold is set, retryable failures also feed a circuit
+        breaker shared per endpoint; while it is open, callers wait for it to
+        close before sending the next attempt.
+        
+        Args:
+            call: Zero-argument function performing one API request
+            label: Prefix for log messages, e.g. "GPT API"
+            cache_key: Response cache key (optional); a successful result is stored under it
+            
+        Returns:
+            Result of call(), or an error string
+        """
+        max_retries = self.max_retries
+        breaker = self._get_breaker()
+        
+        for attempt in range(max_retries):
+            if breaker is not None:
+                remaining = breaker.remaining()
+                if remaining > 0:
+                    print(f"[{label}] Circuit open after repeated failures, waiting {remaining:.1f}s...")
+                    time.sleep(remaining)
+            
+            try:
+                result = call()
+                if breaker is not None:
+                    breaker.record_success()
+                if cache_key is not None:
+                    self.response_cache.put(cache_key, result)
+                return result
+            
+            except Exception as e:
+                if _is_rate_limit_error(e):
+                    if breaker is not None:
+                        breaker.record_failure(e)
+                    self._report_rate_limit()
+                    # Rate limit error - retry with exponential backoff
+                    if attempt < max_retries - 1:
+                        wait_time = self._retry_wait(attempt, e)
+                        print(f"[{label}] Rate limit exceeded (attempt {attempt + 1}/{max_retries}), retrying in {wait_time:.1f}s...")
+                        time.sleep(wait_time)
+                        continue
+                    else:
+                        print(f"[{label} ERROR] Rate limit exceeded after {max_retries} attempts")
+                        return f"Error: Rate limit exceeded - {str(e)}"
+                
+                # Other API errors or general exceptions - retry with exponential backoff
+                error_type = type(e).__name__
+                status_code = getattr(e, 'status_code', None)
+                is_retryable = (
+                    error_type in self.retryable_errors or
+                    status_code in _RETRYABLE_STATUS_CODES
+                )
+                if is_retryable and breaker is not None:
+                    breaker.record_failure(e)
+                if status_code == 429:
+                    self._report_rate_limit()
+                
+                if is_retryable and attempt < max_retries - 1:
+                    wait_time = self._retry_wait(attempt, e)
+                    print(f"[{label}] {error_type} (attempt {attempt + 1}/{max_retries}), retrying in {wait_time:.1f}s...")
+                    time.sleep(wait_time)
+                    continue
+                else:
+                    # Non-retryable error or max retries reached
+                    print(f"[{label} ERROR] {error_type}: {str(e)}")
+                    if attempt == max_retries - 1:
+                        print(f"[{label} ERROR] Failed after {max_retries} attempts")
+                    return f"Error: {str(e)}"
+        
+        # Should not reach here, but just in case
+        return "Error: Max retries exceeded"
+    
     def _load_image_base64(self, image_path: str) -> str:
         """Convert image to base64 encoding"""
-        with open(image_path, 'rb') as f:
-            return base64.b64encode(f.read()).decode('utf-8')
+        data_url = _load_image_data_url(image_path)
+        return data_url[data_url.index(',') + 1:]
+    
+    def _load_image_data_url(self, image_path: str) -> str:
+        """Convert image to a base64 data URL (data:<mime>;base64,...); http(s) URLs are returned unchanged"""
+        if _is_remote_image(image_path):
+            return image_path
+        return _load_image_data_url(image_path)
     
     def _prepare_images(self, images: List[str]) -> List[Dict]:
         """Prepare image data (can be overridden by subclasses)"""
         return [{"path": img} for img in images]
+    
+    def warmup(self) -> threading.Thread:
+        """
+        Open the connection to the API endpoint in a background thread
+        
+        Lets DNS/TCP/TLS setup overlap with data loading so the first
+        prediction reuses an already established keep-alive connection.
+        Failures are ignored; the first real request will simply connect.
+        
+        Returns:
+            The started daemon thread
+        """
+        def _run():
+            try:
+                self._warmup()
+            except Exception:
+                pass
+        
+        thread = threading.Thread(target=_run, daemon=True)
+        thread.start()
+        return thread
+    
+    def _warmup(self):
+        """Lightweight request used by warmup() (can be overridden by subclasses)"""
+        pass
+
+# ==================== OpenAI-Compatible Client ====================
+class OpenAICompatibleModelAPI(BaseModelAPI):
+    """Base for models served through the OpenAI SDK; the client is created on first use"""
+    
+    __slots__ = ("_client", "_client_kwargs")
+    
+    _client_lock = threading.Lock()
+    
+    def __init__(self, api_key: str = None, base_url: str = None, http_client=None,
+                 breaker_threshold: int = None):
+        """
+        Args:
+            api_key: API key
+            base_url: API base URL (optional)
+            http_client: httpx.Client to use (optional, defaults to the shared module pool)
+            breaker_threshold: Consecutive failures that open the circuit breaker (optional, default disabled)
+        """
+        super().__init__(api_key, base_url, breaker_threshold)
+        self._client = None
+        self._client_kwargs = {'api_key': self.api_key, 'http_client': http_client}
+        if base_url:
+            self._client_kwargs['base_url'] = base_url
+    
+    @property
+    def client(self):
+        """OpenAI client, constructed on first access"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._create_client(dict(self._client_kwargs))
+        return self._client
+    
+    @client.setter
+    def client(self, value):
+        self._client = value
+    
+    def _create_client(self, client_kwargs: Dict):
+        """Construct the OpenAI client (can be overridden by subclasses)"""
+        if client_kwargs.get('http_client') is None:
+            client_kwargs['http_client'] = _get_http_client()
+        return _lazy_openai().OpenAI(**client_kwargs)
+    
+    def _warmup(self):
+        """Establish the connection with a cheap models listing request"""
+        self.client.models.list()
+    
+    def predict_prebuilt(self, messages: List[Dict], **kwargs) -> str:
+        """
+        Run a prediction from messages returned by build_messages()
+        
+        Lets callers encode a request once and reuse it across several calls
+        (e.g. temperature sweeps) instead of re-encoding the images each time.
+        
+        Args:
+            messages: Message list from build_messages()
+            **kwargs: Other parameters (e.g., max_tokens, temperature, etc.)
+            
+        Returns:
+            Model output answer text
+        """
+        return self._predict_messages(messages, kwargs)
+    
+    @abstractmethod
+    def _predict_messages(self, messages: List[Dict], kwargs: Dict, cache_key: bytes = None) -> str:
+        """Send prebuilt messages to the API with the retry policy"""
+        pass
 
 # ==================== GPT API Interface ====================
-class GPTModelAPI(BaseModelAPI):
+class GPTModelAPI(OpenAICompatibleModelAPI):
     """OpenAI GPT model API interface"""
     
+    __slots__ = ("model", "max_tokens", "temperature")
+    
     def __init__(self, 
                  api_key: str = None,
                  model: str = "gpt-4o",
                  base_url: str = None,
                  max_tokens: int = None,
-                 temperature: float = 0.0):
+                 temperature: float = 0.0,
+                 http_client=None,
+                 breaker_threshold: int = None):
         """
         Args:
             api_key: OpenAI API key
@@ -82,17 +924,13 @@ class GPTModelAPI(BaseModelAPI):
             base_url: Custom API base URL (optional, for proxy)
             max_tokens: Maximum number of tokens
             temperature: Temperature parameter
+            http_client: httpx.Client to use (optional, defaults to the shared module pool)
+            breaker_threshold: Consecutive failures that open the circuit breaker (optional, default disabled)
         """
-        super().__init__(api_key, base_url)
+        super().__init__(api_key, base_url, http_client, breaker_threshold)
         self.model = model
         self.max_tokens = max_tokens
         self.temperature = temperature
-        
-        # Initialize OpenAI client
-        if base_url:
-            self.client = OpenAI(api_key=self.api_key, base_url=base_url)
-        else:
-            self.client = OpenAI(api_key=self.api_key)
     
     def predict(self, 
                images: List[str], 
@@ -108,6 +946,30 @@ class GPTModelAPI(BaseModelAPI):
             system_message: System message (optional)
             **kwargs: Other parameters (e.g., max_tokens, temperature, etc.)
         """
+        cache_key = self._response_cache_key(images, prompt, dict(kwargs, system_message=system_message))
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        messages = self.build_messages(images, prompt, system_message)
+        return self._predict_messages(messages, kwargs, cache_key)
+    
+    def build_messages(self,
+                       images: List[str],
+                       prompt: str,
+                       system_message: str = None) -> List[Dict]:
+        """
+        Build the chat messages (with encoded images) for a request
+        
+        Args:
+            images: List of image paths
+            prompt: Prompt text
+            system_message: System message (optional)
+            
+        Returns:
+            Message list accepted by predict_prebuilt()
+        """
         # Prepare message list
         messages = []
         
@@ -122,101 +984,49 @@ class GPTModelAPI(BaseModelAPI):
         content = [{"type": "text", "text": prompt}]
         
         # Add images
-        for img_path in images:
-            if not Path(img_path).exists():
-                print(f"Warning: Image not found: {img_path}")
-                continue
-            
-            # Read image and convert to base64
-            image_base64 = self._load_image_base64(img_path)
-            
-            # Determine mime_type based on image format
-            img_ext = Path(img_path).suffix.lower()
-            mime_type_map = {
-                '.png': 'image/png',
-                '.jpg': 'image/jpeg',
-                '.jpeg': 'image/jpeg',
-                '.gif': 'image/gif',
-                '.webp': 'image/webp'
-            }
-            mime_type = mime_type_map.get(img_ext, 'image/png')
-            
-            content.append({
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:{mime_type};base64,{image_base64}"
-                }
-            })
+        content.extend(self.prepare_content(images))
         
         # Add user message
         messages.append({
             "role": "user",
             "content": content
         })
-        
-        # Call API with retry logic
-        max_retries = 3
-        retry_delay = 1  # Initial delay in seconds
-        
-        for attempt in range(max_retries):
-            try:
-                api_params = {
-                    'model': self.model,
-                    'messages': messages,
-                    'temperature': kwargs.get('temperature', self.temperature)
-                }
-                # Only add max_tokens if explicitly provided
-                max_tokens_value = kwargs.get('max_tokens', self.max_tokens)
-                if max_tokens_value is not None:
-                    api_params['max_tokens'] = max_tokens_value
-                
-                response = self.client.chat.completions.create(**api_params)
-                
-                return response.choices[0].message.content.strip()
+        return messages
+    
+    def _predict_messages(self, messages: List[Dict], kwargs: Dict, cache_key: bytes = None) -> str:
+        """Send prebuilt messages to the API (see predict_prebuilt)"""
+        def _call():
+            api_params = {
+                'model': self.model,
+                'messages': messages,
+                'temperature': kwargs.get('temperature', self.temperature)
+            }
+            # Only add max_tokens if explicitly provided
+            max_tokens_value = kwargs.get('max_tokens', self.max_tokens)
+            if max_tokens_value is not None:
+                api_params['max_tokens'] = max_tokens_value
             
-            except RateLimitError as e:
-                # Rate limit error - retry with exponential backoff
-                if attempt < max_retries - 1:
-                    wait_time = retry_delay * (2 ** attempt)
-                    print(f"[GPT API] Rate limit exceeded (attempt {attempt + 1}/{max_retries}), retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    print(f"[GPT API ERROR] Rate limit exceeded after {max_retries} attempts")
-                    return f"Error: Rate limit exceeded - {str(e)}"
+            response = self.client.chat.completions.create(**api_params)
             
-            except (APIError, Exception) as e:
-                # Other API errors or general exceptions - retry with exponential backoff
-                error_type = type(e).__name__
-                is_retryable = (
-                    error_type in ['APIConnectionError', 'APITimeoutError', 'InternalServerError'] or
-                    (hasattr(e, 'status_code') and e.status_code in [429, 500, 502, 503, 504])
-                )
-                
-                if is_retryable and attempt < max_retries - 1:
-                    wait_time = retry_delay * (2 ** attempt)
-                    print(f"[GPT API] {error_type} (attempt {attempt + 1}/{max_retries}), retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    print(f"[GPT API ERROR] {error_type}: {str(e)}")
-                    if attempt == max_retries - 1:
-                        print(f"[GPT API ERROR] Failed after {max_retries} attempts")
-                    return f"Error: {str(e)}"
+            return response.choices[0].message.content.strip()
         
-        # Should not reach here, but just in case
-        return "Error: Max retries exceeded"
+        # Call API with retry logic
+        return self._retry_call(_call, "GPT API", cache_key)
 
 # ==================== Ksyun API Interface ====================
-class KsyunModelAPI(BaseModelAPI):
+class KsyunModelAPI(OpenAICompatibleModelAPI):
     """Ksyun model API interface (compatible with OpenAI format)"""
     
+    __slots__ = ("model", "max_tokens", "temperature")
+    
     def __init__(self,
                  api_key: str = None,
                  model: str = "qwen3-vl-235b-a22b-thinking",
                  base_url: str = "https://kspmas.ksyun.com/v1/",
                  max_tokens: int = None,
-                 temperature: float = 0.0):
+                 temperature: float = 0.0,
+                 http_client=None,
+                 breaker_threshold: int = None):
         """
         Args:
             api_key: Ksyun API key
@@ -224,8 +1034,10 @@ class KsyunModelAPI(BaseModelAPI):
             base_url: API base URL, default Ksyun address
             max_tokens: Maximum number of tokens
             temperature: Temperature parameter
+            http_client: httpx.Client to use (optional, defaults to the shared module pool)
+            breaker_threshold: Consecutive failures that open the circuit breaker (optional, default disabled)
         """
-        super().__init__(api_key, base_url)
+        super().__init__(api_key, base_url, http_client, breaker_threshold)
         self.model = model
         self.max_tokens = max_tokens
         self.temperature = temperature
@@ -236,13 +1048,11 @@ class KsyunModelAPI(BaseModelAPI):
                 "Ksyun API key is required. Please set it in model_config.json or "
                 "provide it via --test_api_key argument or KSYUN_API_KEY environment variable."
             )
-        
-        # Initialize OpenAI client (using Ksyun base_url)
+    
+    def _create_client(self, client_kwargs: Dict):
+        """Construct the OpenAI client (using Ksyun base_url)"""
         try:
-            self.client = OpenAI(
-                api_key=self.api_key,
-                base_url=self.base_url
-            )
+            return super()._create_client(client_kwargs)
         except Exception as e:
             raise ValueError(
                 f"Failed to initialize Ksyun API client: {e}. "
@@ -263,56 +1073,39 @@ class KsyunModelAPI(BaseModelAPI):
             system_message: System message (optional, if explicitly provided)
             **kwargs: Other parameters
         """
+        cache_key = self._response_cache_key(images, prompt, dict(kwargs, system_message=system_message))
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        messages = self.build_messages(images, prompt, system_message)
+        return self._predict_messages(messages, kwargs, cache_key)
+    
+    def build_messages(self,
+                       images: List[str],
+                       prompt: str,
+                       system_message: str = None) -> List[Dict]:
+        """
+        Build the chat messages (with encoded images) for a request
+        
+        Args:
+            images: List of image paths
+            prompt: Prompt text (may be complete system prompt or user message)
+            system_message: System message (optional, if explicitly provided)
+            
+        Returns:
+            Message list accepted by predict_prebuilt()
+        """
         # Prepare message list
         messages = []
         
         # Determine if prompt is a complete system prompt
         # Features: contains keywords like "Vision-Language Model", "Strict rules", "Options:"
-        is_system_prompt = (
-            "Vision-Language Model" in prompt or
-            "Strict rules" in prompt or
-            ("Task:" in prompt and "Options:" in prompt) or
-            prompt.strip().startswith("You are")
-        )
+        is_system_prompt = _is_system_prompt(prompt)
         
-        # Prepare user message content
-        user_content = []
-        
-        # Add images first (following the example format)
-        for img_path in images:
-            if not Path(img_path).exists():
-                print(f"Warning: Image not found: {img_path}")
-                continue
-            
-            # Read image and convert to base64
-            image_base64 = self._load_image_base64(img_path)
-            
-            # Determine mime_type based on image format
-            img_ext = Path(img_path).suffix.lower()
-            mime_type_map = {
-                '.png': 'image/png',
-                '.jpg': 'image/jpeg',
-                '.jpeg': 'image/jpeg',
-                '.gif': 'image/gif',
-                '.webp': 'image/webp'
-            }
-            mime_type = mime_type_map.get(img_ext, 'image/png')
-            
-            # Add image using base64 data URL format
-            user_content.append({
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:{mime_type};base64,{image_base64}"
-                }
-            })
-        
-        # Determine if prompt is a complete system prompt
-        is_system_prompt = (
-            "Vision-Language Model" in prompt or
-            "Strict rules" in prompt or
-            ("Task:" in prompt and "Options:" in prompt) or
-            prompt.strip().startswith("You are")
-        )
+        # Prepare user message content, images first (following the example format)
+        user_content = self.prepare_content(images)
         
         if is_system_prompt:
             # prompt itself is a complete system prompt
@@ -339,94 +1132,67 @@ class KsyunModelAPI(BaseModelAPI):
             "role": "user",
             "content": user_content
         })
-        
-        # Call API with retry logic
-        max_retries = 3
-        retry_delay = 1  # Initial delay in seconds
-        
-        for attempt in range(max_retries):
-            try:
-                # Prepare API call parameters (no max_tokens limit)
-                api_params = {
-                    'model': self.model,
-                    'messages': messages,
-                    'temperature': kwargs.get('temperature', self.temperature)
-                }
-                # Only add max_tokens if explicitly provided in kwargs
-                if 'max_tokens' in kwargs and kwargs['max_tokens'] is not None:
-                    api_params['max_tokens'] = kwargs['max_tokens']
-                
-                response = self.client.chat.completions.create(**api_params)
-                
-                if hasattr(response, 'choices') and len(response.choices) > 0:
-                    choice = response.choices[0]
-                    message = choice.message
-                    content = message.content
-                    
-                    if content:
-                        return content.strip()
-                    else:
-                        # Try to get from dict form
-                        if isinstance(message, dict):
-                            content = message.get('content', '')
-                        elif hasattr(message, '__dict__'):
-                            content = message.__dict__.get('content', '')
-                        return content.strip() if content else ""
-                else:
-                    print(f"[Ksyun API ERROR] No choices in response!")
-                    return ""
+        return messages
+    
+    def _predict_messages(self, messages: List[Dict], kwargs: Dict, cache_key: bytes = None) -> str:
+        """Send prebuilt messages to the API (see predict_prebuilt)"""
+        def _call():
+            # Prepare API call parameters (no max_tokens limit)
+            api_params = {
+                'model': self.model,
+                'messages': messages,
+                'temperature': kwargs.get('temperature', self.temperature)
+            }
+            # Only add max_tokens if explicitly provided in kwargs
+            if 'max_tokens' in kwargs and kwargs['max_tokens'] is not None:
+                api_params['max_tokens'] = kwargs['max_tokens']
             
-            except RateLimitError as e:
-                # Rate limit error - retry with exponential backoff
-                if attempt < max_retries - 1:
-                    wait_time = retry_delay * (2 ** attempt)  # Exponential backoff: 1s, 2s, 4s
-                    print(f"[Ksyun API] Rate limit exceeded (attempt {attempt + 1}/{max_retries}), retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    print(f"[Ksyun API ERROR] Rate limit exceeded after {max_retries} attempts")
-                    return f"Error: Rate limit exceeded - {str(e)}"
+            response = self.client.chat.completions.create(**api_params)
             
-            except (APIError, Exception) as e:
-                # Other API errors or general exceptions - retry with exponential backoff
-                error_type = type(e).__name__
-                is_retryable = (
-                    error_type in ['APIConnectionError', 'APITimeoutError', 'InternalServerError'] or
-                    (hasattr(e, 'status_code') and e.status_code in [429, 500, 502, 503, 504])
-                )
+            if hasattr(response, 'choices') and len(response.choices) > 0:
+                choice = response.choices[0]
+                message = choice.message
+                content = message.content
                 
-                if is_retryable and attempt < max_retries - 1:
-                    wait_time = retry_delay * (2 ** attempt)
-                    print(f"[Ksyun API] {error_type} (attempt {attempt + 1}/{max_retries}), retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                    continue
+                if content:
+                    return content.strip()
                 else:
-                    # Non-retryable error or max retries reached
-                    print(f"[Ksyun API ERROR] {error_type}: {str(e)}")
-                    if attempt == max_retries - 1:
-                        print(f"[Ksyun API ERROR] Failed after {max_retries} attempts")
-                    return f"Error: {str(e)}"
+                    # Try to get from dict form
+                    if isinstance(message, dict):
+                        content = message.get('content', '')
+                    elif hasattr(message, '__dict__'):
+                        content = message.__dict__.get('content', '')
+                    return content.strip() if content else ""
+            else:
+                print(f"[Ksyun API ERROR] No choices in response!")
+                return ""
         
-        # Should not reach here, but just in case
-        return "Error: Max retries exceeded"
+        # Call API with retry logic
+        return self._retry_call(_call, "Ksyun API", cache_key)
 
 # ==================== Qwen API Interface ====================
 class QwenModelAPI(BaseModelAPI):
     """Alibaba Cloud Qwen model API interface"""
     
+    __slots__ = ("model", "max_tokens", "temperature")
+    
+    retryable_errors = ('ConnectionError', 'TimeoutError', 'HTTPError')
+    
     def __init__(self,
                  api_key: str = None,
                  model: str = "qwen-vl-max",
                  max_tokens: int = None,
-                 temperature: float = 0.0):
+                 temperature: float = 0.0,
+                 breaker_threshold: int = None):
         """
         Args:
             api_key: DashScope API key
             model: Model name, e.g., "qwen-vl-max", "qwen-vl-plus"
             max_tokens: Maximum number of tokens
             temperature: Temperature parameter
+            breaker_threshold: Consecutive failures that open the circuit breaker (optional, default disabled)
         """
-        super().__init__(api_key)
+        super().__init__(api_key, breaker_threshold=breaker_threshold)
         self.model = model
         self.max_tokens = max_tokens
         self.temperature = temperature
@@ -447,6 +1213,12 @@ class QwenModelAPI(BaseModelAPI):
             prompt: Prompt text
             **kwargs: Other parameters
         """
+        cache_key = self._response_cache_key(images, prompt, kwargs)
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
         # Prepare message content
         messages = []
         
@@ -455,11 +1227,11 @@ class QwenModelAPI(BaseModelAPI):
         
         # Add images
         for img_path in images:
-            if not Path(img_path).exists():
+            if not _is_remote_image(img_path) and not _image_exists(img_path):
                 print(f"Warning: Image not found: {img_path}")
                 continue
             
-            # Qwen needs to add image path to content
+            # Qwen needs to add image path (or URL) to content
             content_list.append({
                 "image": img_path
             })
@@ -483,75 +1255,44 @@ class QwenModelAPI(BaseModelAPI):
                 "content": content_list
             })
         
-        # Call API with retry logic
-        max_retries = 3
-        retry_delay = 1  # Initial delay in seconds
-        
-        for attempt in range(max_retries):
-            try:
-                api_params = {
-                    'model': self.model,
-                    'messages': messages,
-                    'temperature': kwargs.get('temperature', self.temperature)
-                }
-                # Only add max_tokens if explicitly provided
-                max_tokens_value = kwargs.get('max_tokens', self.max_tokens)
-                if max_tokens_value is not None:
-                    api_params['max_tokens'] = max_tokens_value
-                
-                response = MultiModalConversation.call(**api_params)
-                
-                if response.status_code == 200:
-                    # Extract text content
-                    if hasattr(response, 'output') and hasattr(response.output, 'choices'):
-                        content = response.output.choices[0].message.content
-                        # content may be list or string
-                        if isinstance(content, list):
-                            # Find text type content
-                            for item in content:
-                                if isinstance(item, dict) and item.get('type') == 'text':
-                                    return item.get('text', '').strip()
-                            # If text not found, try to get first element directly
-                            if content:
-                                return str(content[0]).strip()
-                        elif isinstance(content, str):
-                            return content.strip()
-                    return "Error: Unable to parse response"
-                else:
-                    # Check if error is retryable
-                    error_msg = getattr(response, 'message', 'Unknown error')
-                    status_code = getattr(response, 'status_code', None)
-                    is_retryable = status_code in [429, 500, 502, 503, 504]
-                    
-                    if is_retryable and attempt < max_retries - 1:
-                        wait_time = retry_delay * (2 ** attempt)
-                        print(f"[Qwen API] Error {status_code} (attempt {attempt + 1}/{max_retries}), retrying in {wait_time}s...")
-                        time.sleep(wait_time)
-                        continue
-                    else:
-                        print(f"[Qwen API ERROR] {error_msg}")
-                        return f"Error: {error_msg}"
+        def _call():
+            api_params = {
+                'model': self.model,
+                'messages': messages,
+                'temperature': kwargs.get('temperature', self.temperature)
+            }
+            # Only add max_tokens if explicitly provided
+            max_tokens_value = kwargs.get('max_tokens', self.max_tokens)
+            if max_tokens_value is not None:
+                api_params['max_tokens'] = max_tokens_value
             
-            except Exception as e:
-                error_type = type(e).__name__
-                is_retryable = (
-                    error_type in ['ConnectionError', 'TimeoutError', 'HTTPError'] or
-                    (hasattr(e, 'status_code') and e.status_code in [429, 500, 502, 503, 504])
-                )
-                
-                if is_retryable and attempt < max_retries - 1:
-                    wait_time = retry_delay * (2 ** attempt)
-                    print(f"[Qwen API] {error_type} (attempt {attempt + 1}/{max_retries}), retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    print(f"[Qwen API ERROR] {error_type}: {str(e)}")
-                    if attempt == max_retries - 1:
-                        print(f"[Qwen API ERROR] Failed after {max_retries} attempts")
-                    return f"Error: {str(e)}"
+            response = _lazy_multimodal_conversation().call(**api_params)
+            
+            if response.status_code == 200:
+                # Extract text content
+                if hasattr(response, 'output') and hasattr(response.output, 'choices'):
+                    content = response.output.choices[0].message.content
+                    # content may be list or string
+                    if isinstance(content, list):
+                        # Find text type content
+                        for item in content:
+                            if isinstance(item, dict) and item.get('type') == 'text':
+                                return item.get('text', '').strip()
+                        # If text not found, try to get first element directly
+                        if content:
+                            return str(content[0]).strip()
+                    elif isinstance(content, str):
+                        return content.strip()
+                return "Error: Unable to parse response"
+            
+            # Let the retry helper decide based on the status code
+            raise ResponseStatusError(
+                getattr(response, 'status_code', None),
+                getattr(response, 'message', 'Unknown error')
+            )
         
-        # Should not reach here, but just in case
-        return "Error: Max retries exceeded"
+        # Call API with retry logic
+        return self._retry_call(_call, "Qwen API", cache_key)
 
 # ==================== Model Factory ====================
 class ModelFactory:
@@ -568,7 +1309,7 @@ class ModelFactory:
         Args:
             model_type: Model type, e.g., "gpt", "qwen", "ksyun", "mog" (ignored if model_alias is provided)
             model_alias: Model alias, e.g., "qwen3-vl-235b", will read config from config file
-            config_manager: Config manager instance (optional, will create default instance if not provided)
+            config_manager: Config manager instance (optional, will use the shared default instance if not provided)
             **kwargs: Model initialization parameters (will override config file parameters)
             
         Returns:
@@ -578,13 +1319,12 @@ class ModelFactory:
         actual_model_type = None
         if model_alias:
             try:
-                try:
-                    from .config_manager import ModelConfigManager
-                except ImportError:
-                    from config_manager import ModelConfigManager
-                
                 if config_manager is None:
-                    config_manager = ModelConfigManager()
+                    try:
+                        from .config_manager import get_config_manager
+                    except ImportError:
+                        from config_manager import get_config_manager
+                    config_manager = get_config_manager()
                 
                 # Get model type and parameters
                 actual_model_type = config_manager.get_model_type(model_alias)
@@ -616,6 +1356,8 @@ class ModelFactory:
         if model_type in ["gpt", "gpt-4", "gpt-4o", "gpt-4-vision"]:
             return GPTModelAPI(**kwargs)
         elif model_type in ["qwen", "qwen-vl", "qwen-vl-max", "qwen-vl-plus"]:
+            # DashScope SDK manages its own connections
+            kwargs.pop("http_client", None)
             return QwenModelAPI(**kwargs)
         elif model_type in ["ksyun", "mog", "mog-1", "qwen3-vl-235b"]:
             # Set default values
@@ -3,7 +3,8 @@ Medical Image VQA System Prompt Manager
 Supports dynamic prompt generation for different sequence types and question types
 """
 
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional, Union
 from enum import Enum
 import json
 import re
@@ -24,6 +25,14 @@ class SequenceView(Enum):
     PERFUSION = "perfusion"
     T2_SAX = "T2_sax"
 
+# Value -> member lookup (members map to themselves), avoiding Enum.__call__ on every prompt
+_SEQUENCE_VIEWS = {sv.value: sv for sv in SequenceView}
+_SEQUENCE_VIEWS.update({sv: sv for sv in SequenceView})
+
+def _resolve_sequence_view(sequence_view) -> SequenceView:
+    """Convert a sequence view string to SequenceView, defaulting to CINE_SAX if unknown"""
+    return _SEQUENCE_VIEWS.get(sequence_view, SequenceView.CINE_SAX)
+
 # ==================== Sequence Description Information ====================
 SEQUENCE_DESCRIPTIONS = {
     SequenceView.CINE_SAX: {
@@ -64,6 +73,30 @@ SEQUENCE_DESCRIPTIONS = {
 }
 
 # ==================== Cine Sequence Specific System Prompts ====================
+# "Strict rules" block shared by the single-choice A/B cine prompts
+_CINE_BINARY_RULES = """Strict rules:
+
+- Choose only A or B; select exactly one.
+
+- Output MUST be a single letter only (A or B).
+
+- No explanations, reasoning, descriptions, confidence, or extra characters.
+
+- No external knowledge or clinical context; images only.
+
+- Even if uncertain, choose the most likely answer.
+
+"""
+
+def _cine_binary_prompt(task: str, option_a: str, option_b: str) -> str:
+    """Build a single-choice A/B cine prompt from its task wording and two options"""
+    return (
+        "You are a Vision-Language Model (VLM) for cardiac cine MRI. Task: using ONLY the provided frames, "
+        + task + " (single-choice).\n\n"
+        + _CINE_BINARY_RULES
+        + "Options:\n\nA. " + option_a + "\n\nB. " + option_b
+    )
+
 CINE_SPECIFIC_PROMPTS = {
     # Thickening (LV Wall Thickness) - Multi-select
     ("Thickening", "cine_sax", True, "prompt"): """You are a Vision-Language Model (VLM) for cardiac cine MRI. Task: using ONLY the provided image frames, answer the LV wall thickness characteristic (multi-select).
@@ -164,88 +197,32 @@ B. Reduced
 C. Enhanced""",
 
     # Diastolic Function - Single-choice
-    ("Diastolic Function", "cine_4ch", False, "prompt"): """You are a Vision-Language Model (VLM) for cardiac cine MRI. Task: using ONLY the provided frames, decide LV diastolic function (single-choice).
-
-Strict rules:
-
-- Choose only A or B; select exactly one.
-
-- Output MUST be a single letter only (A or B).
-
-- No explanations, reasoning, descriptions, confidence, or extra characters.
-
-- No external knowledge or clinical context; images only.
-
-- Even if uncertain, choose the most likely answer.
-
-Options:
-
-A. Normal
-
-B. Restrictive (impaired)""",
+    ("Diastolic Function", "cine_4ch", False, "prompt"): _cine_binary_prompt(
+        "decide LV diastolic function",
+        "Normal",
+        "Restrictive (impaired)"
+    ),
 
     # Mitral Regurgitation - Single-choice
-    ("Mitral Regurgitation", "cine_4ch", False, "prompt"): """You are a Vision-Language Model (VLM) for cardiac cine MRI. Task: using ONLY the provided frames, determine whether mitral regurgitation is present (single-choice).
-
-Strict rules:
-
-- Choose only A or B; select exactly one.
-
-- Output MUST be a single letter only (A or B).
-
-- No explanations, reasoning, descriptions, confidence, or extra characters.
-
-- No external knowledge or clinical context; images only.
-
-- Even if uncertain, choose the most likely answer.
-
-Options:
-
-A. Regurgitation
-
-B. No regurgitation""",
+    ("Mitral Regurgitation", "cine_4ch", False, "prompt"): _cine_binary_prompt(
+        "determine whether mitral regurgitation is present",
+        "Regurgitation",
+        "No regurgitation"
+    ),
 
     # Tricuspid Regurgitation - Single-choice
-    ("Tricuspid Regurgitation", "cine_4ch", False, "prompt"): """You are a Vision-Language Model (VLM) for cardiac cine MRI. Task: using ONLY the provided frames, determine whether tricuspid regurgitation is present (single-choice).
-
-Strict rules:
-
-- Choose only A or B; select exactly one.
-
-- Output MUST be a single letter only (A or B).
-
-- No explanations, reasoning, descriptions, confidence, or extra characters.
-
-- No external knowledge or clinical context; images only.
-
-- Even if uncertain, choose the most likely answer.
-
-Options:
-
-A. Regurgitation
-
-B. No regurgitation""",
+    ("Tricuspid Regurgitation", "cine_4ch", False, "prompt"): _cine_binary_prompt(
+        "determine whether tricuspid regurgitation is present",
+        "Regurgitation",
+        "No regurgitation"
+    ),
 
     # Aortic Regurgitation - Single-choice
-    ("Aortic Regurgitation", "cine_3ch", False, "prompt"): """You are a Vision-Language Model (VLM) for cardiac cine MRI. Task: using ONLY the provided frames, determine whether aortic regurgitation is present (single-choice).
-
-Strict rules:
-
-- Choose only A or B; select exactly one.
-
-- Output MUST be a single letter only (A or B).
-
-- No explanations, reasoning, descriptions, confidence, or extra characters.
-
-- No external knowledge or clinical context; images only.
-
-- Even if uncertain, choose the most likely answer.
-
-Options:
-
-A. Regurgitation
-
-B. No regurgitation""",
+    ("Aortic Regurgitation", "cine_3ch", False, "prompt"): _cine_binary_prompt(
+        "determine whether aortic regurgitation is present",
+        "Regurgitation",
+        "No regurgitation"
+    ),
 
     # Special Signs - Multi-select
     ("Special Signs", "cine_3ch", True, "prompt"): """You are a Vision-Language Model (VLM) for cardiac cine MRI. Task: using ONLY the provided frames, select which special signs are present (multi-select).
@@ -279,48 +256,29 @@ E. Pulmonary artery dilatation
 F. No special signs present""",
 
     # Pericardial Effusion - Single-choice
-    ("Pericardial Effusion", "cine_4ch", False, "prompt"): """You are a Vision-Language Model (VLM) for cardiac cine MRI. Task: using ONLY the provided frames, determine whether pericardial effusion is present (single-choice).
-
-Strict rules:
-
-- Choose only A or B; select exactly one.
-
-- Output MUST be a single letter only (A or B).
-
-- No explanations, reasoning, descriptions, confidence, or extra characters.
-
-- No external knowledge or clinical context; images only.
-
-- Even if uncertain, choose the most likely answer.
-
-Options:
-
-A. Yes (effusion present)
-
-B. No (effusion absent)""",
+    ("Pericardial Effusion", "cine_4ch", False, "prompt"): _cine_binary_prompt(
+        "determine whether pericardial effusion is present",
+        "Yes (effusion present)",
+        "No (effusion absent)"
+    ),
 
     # Pleural Effusion - Single-choice
-    ("Pleural Effusion", "cine_4ch", False, "prompt"): """You are a Vision-Language Model (VLM) for cardiac cine MRI. Task: using ONLY the provided frames, determine whether pleural effusion is present (single-choice).
-
-Strict rules:
-
-- Choose only A or B; select exactly one.
-
-- Output MUST be a single letter only (A or B).
-
-- No explanations, reasoning, descriptions, confidence, or extra characters.
-
-- No external knowledge or clinical context; images only.
-
-- Even if uncertain, choose the most likely answer.
-
-Options:
-
-A. Yes (effusion present)
-
-B. No (effusion absent)""",
+    ("Pleural Effusion", "cine_4ch", False, "prompt"): _cine_binary_prompt(
+        "determine whether pleural effusion is present",
+        "Yes (effusion present)",
+        "No (effusion absent)"
+    ),
 }
 
+# ==================== Shared Output Format Rules ====================
+# "Output format" rule used by the LGE, Perfusion and T2 prompts
+_OUTPUT_FMT_SINGLE = """- Output format:
+  - If include_reason=True: Line 1 = single letter; Line 2 = "Reason: ..."
+  - Else: Line 1 = single letter only"""
+_OUTPUT_FMT_MULTI = """- Output format:
+  - If include_reason=True: Line 1 = letters; Line 2 = "Reason: ..."
+  - Else: Line 1 = letters only"""
+
 # ==================== LGE Sequence Specific System Prompts ====================
 LGE_SPECIFIC_PROMPTS = {
     # Enhancement Status - Single-choice
@@ -329,9 +287,7 @@ Task: Using ONLY the provided image frames, decide whether abnormal delayed enha
 
 Strict rules:
 - Choose exactly ONE option: A or B.
-- Output format:
-  - If include_reason=True: Line 1 = single letter; Line 2 = "Reason: ..."
-  - Else: Line 1 = single letter only
+""" + _OUTPUT_FMT_SINGLE + """
 - Use images only; do not use external knowledge.
 - Even if uncertain, choose the most likely answer.
 
@@ -345,9 +301,7 @@ Task: Using ONLY the provided image frames, classify the signal appearance of th
 
 Strict rules:
 - Choose exactly ONE option: A or B.
-- Output format:
-  - If include_reason=True: Line 1 = single letter; Line 2 = "Reason: ..."
-  - Else: Line 1 = single letter only
+""" + _OUTPUT_FMT_SINGLE + """
 - Use images only; do not use external knowledge.
 - Even if uncertain, choose the most likely answer.
 
@@ -366,9 +320,7 @@ Task: Using ONLY the provided image frames, select which long-axis segments show
 Strict rules:
 - Select one or more from A/B/C/D/E/Z.
 - Output letters only; use English commas for multiple selections (e.g., B or C,D or Z).
-- Output format:
-  - If include_reason=True: Line 1 = letters; Line 2 = "Reason: ..."
-  - Else: Line 1 = letters only
+""" + _OUTPUT_FMT_MULTI + """
 - Use images only; do not use external knowledge.
 - If no clear abnormal enhancement is visible, choose Z.
 
@@ -387,9 +339,7 @@ Task: Using ONLY the provided image frames, select which LV wall regions show hi
 Strict rules:
 - Select one or more from A/B/C/D/E/F/Z.
 - Output letters only; use English commas for multiple selections.
-- Output format:
-  - If include_reason=True: Line 1 = letters; Line 2 = "Reason: ..."
-  - Else: Line 1 = letters only
+""" + _OUTPUT_FMT_MULTI + """
 - Use images only; do not use external knowledge.
 - If no clear abnormal enhancement is visible, choose Z.
 
@@ -409,9 +359,7 @@ Task: Using ONLY the provided image frames, select the distribution pattern(s) o
 Strict rules:
 - Select one or more from A/B/C/D/E/Z.
 - Output letters only; use English commas.
-- Output format:
-  - If include_reason=True: Line 1 = letters; Line 2 = "Reason: ..."
-  - Else: Line 1 = letters only
+""" + _OUTPUT_FMT_MULTI + """
 - Use images only; do not use external knowledge.
 - If no clear enhancement is visible, choose Z.
 
@@ -437,9 +385,7 @@ Task: Using ONLY the provided image frames, select which myocardial layer(s) sho
 Strict rules:
 - Select one or more from A/B/C/D/E/Z.
 - Output letters only; use English commas.
-- Output format:
-  - If include_reason=True: Line 1 = letters; Line 2 = "Reason: ..."
-  - Else: Line 1 = letters only
+""" + _OUTPUT_FMT_MULTI + """
 - Use images only; do not use external knowledge.
 - If no clear enhancement is visible, choose Z.
 
@@ -465,9 +411,7 @@ Task: Using ONLY the provided image frames, select any special visible features
 Strict rules:
 - Select one or more from A/B/C/D.
 - Output letters only; use English commas.
-- Output format:
-  - If include_reason=True: Line 1 = letters; Line 2 = "Reason: ..."
-  - Else: Line 1 = letters only
+""" + _OUTPUT_FMT_MULTI + """
 - Use images only; do not use external knowledge.
 - If none apply, choose A.
 
@@ -484,9 +428,7 @@ Task: Using ONLY the provided image frames, select which LV wall regions show a
 Strict rules:
 - Select one or more from A/B/C/D/E/F/Z.
 - Output letters only; use English commas for multiple selections.
-- Output format:
-  - If include_reason=True: Line 1 = letters; Line 2 = "Reason: ..."
-  - Else: Line 1 = letters only
+""" + _OUTPUT_FMT_MULTI + """
 - Use images only; do not use external knowledge.
 - Only label findings that are visually located within the myocardium (exclude LV cavity/blood pool darkness).
 - Operational criteria (image-only):
@@ -510,9 +452,7 @@ Task: Using ONLY the provided image frames, select the distribution pattern(s) o
 Strict rules:
 - Select one or more from A/B/C/D/E/Z.
 - Output letters only; use English commas.
-- Output format:
-  - If include_reason=True: Line 1 = letters; Line 2 = "Reason: ..."
-  - Else: Line 1 = letters only
+""" + _OUTPUT_FMT_MULTI + """
 - Use images only; do not use external knowledge.
 - Apply the pattern labels to the LOW-SIGNAL area itself.
 - If no clear myocardial low-signal abnormality is visible, choose Z.
@@ -539,9 +479,7 @@ Task: Using ONLY the provided image frames, select which LV slice-level segments
 Strict rules:
 - Select one or more from A/B/C/D/E/Z.
 - Output letters only; use English commas for multiple selections.
-- Output format:
-  - If include_reason=True: Line 1 = letters; Line 2 = "Reason: ..."
-  - Else: Line 1 = letters only
+""" + _OUTPUT_FMT_MULTI + """
 - Use images only; do not use external knowledge.
 - Only label findings that are visually located within the myocardium or papillary muscles (exclude LV cavity/blood pool darkness).
 - Operational criteria (image-only):
@@ -564,9 +502,7 @@ Task: Using ONLY the provided image frames, select which myocardial layer(s) sho
 Strict rules:
 - Select one or more from A/B/C/D/E/Z.
 - Output letters only; use English commas.
-- Output format:
-  - If include_reason=True: Line 1 = letters; Line 2 = "Reason: ..."
-  - Else: Line 1 = letters only
+""" + _OUTPUT_FMT_MULTI + """
 - Use images only; do not use external knowledge.
 - Only label findings that are visually within the myocardium or papillary muscles (exclude LV cavity/blood pool darkness).
 - Operational criteria (image-only):
@@ -598,9 +534,7 @@ Task: Using ONLY the provided image frames, decide whether myocardial perfusion
 
 Strict rules:
 - Choose exactly ONE option: A or B.
-- Output format:
-  - If include_reason=True: Line 1 = single letter; Line 2 = "Reason: ..."
-  - Else: Line 1 = single letter only
+""" + _OUTPUT_FMT_SINGLE + """
 - Use images only; do not use external knowledge.
 - Evaluate across the provided time frames (arrival and wash-in phase as shown).
 - Even if uncertain, choose the most likely answer.
@@ -616,9 +550,7 @@ Task: Using ONLY the provided image frames, select which LV wall regions show ab
 Strict rules:
 - Select one or more from A/B/C/D/E/F/Z.
 - Output letters only; use English commas.
-- Output format:
-  - If include_reason=True: Line 1 = letters; Line 2 = "Reason: ..."
-  - Else: Line 1 = letters only
+""" + _OUTPUT_FMT_MULTI + """
 - Use images only; do not use external knowledge.
 - If no abnormal region is visible, choose Z.
 
@@ -637,9 +569,7 @@ Task: Using ONLY the provided image frames, classify the visual type of perfusio
 
 Strict rules:
 - Choose exactly ONE option: A or B or C.
-- Output format:
-  - If include_reason=True: Line 1 = single letter; Line 2 = "Reason: ..."
-  - Else: Line 1 = single letter only
+""" + _OUTPUT_FMT_SINGLE + """
 - Use images only; do not use external knowledge.
 - Use the operational visual definitions below.
 - Even if uncertain, choose the most likely answer.
@@ -661,9 +591,7 @@ Task: Using ONLY the provided image frames, select which myocardial layers show
 Strict rules:
 - Select one or more from A/B/C/D/E/Z.
 - Output letters only; use English commas.
-- Output format:
-  - If include_reason=True: Line 1 = letters; Line 2 = "Reason: ..."
-  - Else: Line 1 = letters only
+""" + _OUTPUT_FMT_MULTI + """
 - Use images only; do not use external knowledge.
 - If no abnormality is visible, choose Z.
 
@@ -689,9 +617,7 @@ Task: Using ONLY the provided image frames, select which LV slice-level segments
 Strict rules:
 - Select one or more from A/B/C/D/Z.
 - Output letters only; use English commas.
-- Output format:
-  - If include_reason=True: Line 1 = letters; Line 2 = "Reason: ..."
-  - Else: Line 1 = letters only
+""" + _OUTPUT_FMT_MULTI + """
 - Use images only; do not use external knowledge.
 - Evaluate abnormality across the provided time frames (wash-in as shown).
 - If no abnormal segment is visible, choose Z.
@@ -712,9 +638,7 @@ Task: Using ONLY the provided image frames, classify the overall myocardial T2 s
 
 Strict rules:
 - Choose exactly ONE option: A or B or C or D.
-- Output format:
-  - If include_reason=True: Line 1 = single letter; Line 2 = "Reason: ..."
-  - Else: Line 1 = single letter only
+""" + _OUTPUT_FMT_SINGLE + """
 - Use images only; do not use external knowledge.
 - Even if uncertain, choose the most likely answer.
 
@@ -731,9 +655,7 @@ Task: Using ONLY the provided image frames, select which LV segments show abnorm
 Strict rules:
 - Select one or more from A/B/C/D/Z.
 - Output letters only; use English commas.
-- Output format:
-  - If include_reason=True: Line 1 = letters; Line 2 = "Reason: ..."
-  - Else: Line 1 = letters only
+""" + _OUTPUT_FMT_MULTI + """
 - Use images only; do not use external knowledge.
 - If no abnormal segment is visible, choose Z.
 
@@ -751,9 +673,7 @@ Task: Using ONLY the provided image frames, select which LV wall regions show ab
 Strict rules:
 - Select one or more from A/B/C/D/E/F/Z.
 - Output letters only; use English commas.
-- Output format:
-  - If include_reason=True: Line 1 = letters; Line 2 = "Reason: ..."
-  - Else: Line 1 = letters only
+""" + _OUTPUT_FMT_MULTI + """
 - Use images only; do not use external knowledge.
 - If no abnormal region is visible, choose Z.
 
@@ -773,9 +693,7 @@ Task: Using ONLY the provided image frames, select the distribution pattern(s) o
 Strict rules:
 - Select one or more from A/B/C/D/E/Z.
 - Output letters only; use English commas.
-- Output format:
-  - If include_reason=True: Line 1 = letters; Line 2 = "Reason: ..."
-  - Else: Line 1 = letters only
+""" + _OUTPUT_FMT_MULTI + """
 - Use images only; do not use external knowledge.
 - If no abnormal signal is visible, choose Z.
 
@@ -801,9 +719,7 @@ Task: Using ONLY the provided image frames, select which myocardial layer(s) sho
 Strict rules:
 - Select one or more from A/B/C/D/E/Z.
 - Output letters only; use English commas for multiple selections.
-- Output format:
-  - If include_reason=True: Line 1 = letters; Line 2 = "Reason: ..."
-  - Else: Line 1 = letters only
+""" + _OUTPUT_FMT_MULTI + """
 - Use images only; do not use external knowledge.
 - Abnormal T2 signal can be higher or lower than adjacent myocardium; base your choice on visible contrast.
 - If no clear abnormal myocardial T2 signal is visible, choose Z.
@@ -824,6 +740,25 @@ E. Papillary Muscle
 Z. None""",
 }
 
+# ==================== Combined Specific Prompt Lookup ====================
+# Keys carry the sequence view, so all specific prompts fit in one table
+_ALL_SPECIFIC_PROMPTS = {
+    **CINE_SPECIFIC_PROMPTS,
+    **LGE_SPECIFIC_PROMPTS,
+    **PERFUSION_SPECIFIC_PROMPTS,
+    **T2_SPECIFIC_PROMPTS,
+}
+assert len(_ALL_SPECIFIC_PROMPTS) == (
+    len(CINE_SPECIFIC_PROMPTS) + len(LGE_SPECIFIC_PROMPTS) +
+    len(PERFUSION_SPECIFIC_PROMPTS) + len(T2_SPECIFIC_PROMPTS)
+), "Duplicate key across sequence-specific prompt dictionaries"
+
+# Cine sequence views (special field handling and reason formatting)
+_CINE_VIEWS = frozenset(["cine_sax", "cine_4ch", "cine_3ch"])
+
+# Sequence views that have specific prompts
+_SPECIFIC_PROMPT_VIEWS = frozenset(["cine_sax", "cine_4ch", "cine_3ch", "LGE_sax", "LGE_4ch", "perfusion", "T2_sax"])
+
 # ==================== Reason Analysis Templates ====================
 REASON_TEMPLATES = {
     # Thickening (LV Wall Thickness)
@@ -1101,14 +1036,78 @@ Example structure: "The pleural spaces show [normal/abnormal] appearance. [Prese
 5) Selected pattern(s) (or None)""",
 }
 
+# ==================== Cine Field Disambiguation ====================
+# Cine "Valves"/"Effusion" questions map to a specific field by keyword (English or Chinese).
+# Patterns are checked in order, so the first listed field wins when several keywords appear.
+_VALVE_FIELD_PATTERNS = (
+    ("Mitral Regurgitation", re.compile(r"mitral|二尖瓣", re.IGNORECASE)),
+    ("Tricuspid Regurgitation", re.compile(r"tricuspid|三尖瓣", re.IGNORECASE)),
+    ("Aortic Regurgitation", re.compile(r"aortic|主动脉瓣", re.IGNORECASE)),
+)
+_EFFUSION_FIELD_PATTERNS = (
+    ("Pericardial Effusion", re.compile(r"pericardial|心包", re.IGNORECASE)),
+    ("Pleural Effusion", re.compile(r"pleural|胸腔", re.IGNORECASE)),
+)
+
+def _match_field_key(patterns, question: str) -> Optional[str]:
+    """Return the first field whose keyword pattern occurs in the question, or None"""
+    for field_key, pattern in patterns:
+        if pattern.search(question):
+            return field_key
+    return None
+
+# ==================== Choice Question Instructions ====================
+def _build_choice_instruction(is_multiple_choice: bool, include_reason: bool) -> str:
+    """Instruction block for a choice question (independent of view and question text)"""
+    choice_type = "multiple choice" if is_multiple_choice else "single choice"
+    instruction = f"""
+Instructions for {choice_type.upper()} questions:
+1. Carefully examine all provided images in the sequence
+2. Analyze the relevant anatomical structures and pathological findings
+3. Compare your observations with each option provided
+4. For {"multiple choice" if is_multiple_choice else "single choice"} questions, {"select ALL correct options" if is_multiple_choice else "select the ONE best answer"}
+5. Provide your answer in the format: "X. Option Name" {"(separate multiple answers with semicolons)" if is_multiple_choice else ""}"""
+    
+    if include_reason:
+        instruction += """
+6. After your answer, provide a brief reason explaining why you chose this answer
+
+Please provide your answer in the following format:
+Answer: [letter(s) or "X. Option Name"]
+Reason: [brief explanation]"""
+    
+    return instruction
+
+# All four (is_multiple_choice, include_reason) variants, formatted once
+_CHOICE_INSTRUCTIONS = {
+    (is_mc, include_reason): _build_choice_instruction(is_mc, include_reason)
+    for is_mc in (False, True)
+    for include_reason in (False, True)
+}
+
+# Short answer instruction block; only the word limit and question vary
+_SHORT_ANSWER_INSTRUCTION = """
+Instructions for SHORT ANSWER questions:
+1. Carefully examine all provided images in the sequence
+2. Provide a concise, clinically accurate answer based on your observations
+3. Focus on key findings relevant to the question
+4. Use standard medical terminology
+5. Keep your answer within {max_length} words
+
+Question:
+{question}
+
+Answer:"""
+
 # ==================== Test Model Prompt Templates ====================
 class TestModelPromptGenerator:
     """Test model prompt generator (for making models answer questions)"""
     
     @staticmethod
-    def get_base_prompt(sequence_view: SequenceView) -> str:
-        """Get base prompt"""
-        seq_info = SEQUENCE_DESCRIPTIONS[sequence_view]
+    @lru_cache(maxsize=None)
+    def get_base_prompt(sequence_view: Union[SequenceView, str]) -> str:
+        """Get base prompt (built once per sequence view; accepts a SequenceView or its string value)"""
+        seq_info = SEQUENCE_DESCRIPTIONS[_SEQUENCE_VIEWS.get(sequence_view, sequence_view)]
         return f"""You are an expert cardiac MRI radiologist analyzing {seq_info['name']} images.
 
 Sequence Information:
@@ -1133,32 +1132,11 @@ Your task is to carefully analyze the provided cardiac MRI images and answer que
             include_reason: Whether to require output of reasoning
         """
         base = TestModelPromptGenerator.get_base_prompt(sequence_view)
-        
-        choice_type = "multiple choice" if is_multiple_choice else "single choice"
-        instruction = f"""
-Instructions for {choice_type.upper()} questions:
-1. Carefully examine all provided images in the sequence
-2. Analyze the relevant anatomical structures and pathological findings
-3. Compare your observations with each option provided
-4. For {"multiple choice" if is_multiple_choice else "single choice"} questions, {"select ALL correct options" if is_multiple_choice else "select the ONE best answer"}
-5. Provide your answer in the format: "X. Option Name" {"(separate multiple answers with semicolons)" if is_multiple_choice else ""}"""
+        instruction = _CHOICE_INSTRUCTIONS[(bool(is_multiple_choice), bool(include_reason))]
         
         if include_reason:
-            instruction += """
-6. After your answer, provide a brief reason explaining why you chose this answer
-
-Please provide your answer in the following format:
-Answer: [letter(s) or "X. Option Name"]
-Reason: [brief explanation]"""
-        else:
-            instruction += "\n\nQuestion:\n" + question + "\n\nAnswer:"
-        
-        if not include_reason:
-            instruction = base + instruction
-        else:
-            instruction = base + "\n\nQuestion:\n" + question + "\n\n" + instruction
-        
-        return instruction
+            return base + "\n\nQuestion:\n" + question + "\n\n" + instruction
+        return base + instruction + "\n\nQuestion:\n" + question + "\n\nAnswer:"
     
     @staticmethod
     def get_short_answer_prompt(sequence_view: SequenceView, 
@@ -1173,21 +1151,7 @@ Reason: [brief explanation]"""
             max_length: Maximum answer length
         """
         base = TestModelPromptGenerator.get_base_prompt(sequence_view)
-        
-        instruction = f"""
-Instructions for SHORT ANSWER questions:
-1. Carefully examine all provided images in the sequence
-2. Provide a concise, clinically accurate answer based on your observations
-3. Focus on key findings relevant to the question
-4. Use standard medical terminology
-5. Keep your answer within {max_length} words
-
-Question:
-{question}
-
-Answer:"""
-        
-        return base + instruction
+        return base + _SHORT_ANSWER_INSTRUCTION.format(max_length=max_length, question=question)
     
     @staticmethod
     def get_reason_template(field: str, sequence_view: str, is_multiple_choice: bool) -> Optional[str]:
@@ -1224,101 +1188,103 @@ Answer:"""
         Returns:
             Returns matched specific prompt if found, otherwise None
         """
-        # Determine which prompt dictionary to use
-        if sequence_view in ["LGE_sax", "LGE_4ch"]:
-            prompt_dict = LGE_SPECIFIC_PROMPTS
-        elif sequence_view == "perfusion":
-            prompt_dict = PERFUSION_SPECIFIC_PROMPTS
-        elif sequence_view == "T2_sax":
-            prompt_dict = T2_SPECIFIC_PROMPTS
-        elif sequence_view in ["cine_sax", "cine_4ch", "cine_3ch"]:
-            prompt_dict = CINE_SPECIFIC_PROMPTS
-        else:
-            return None
-        
         # Handle special cases for Cine sequences
-        if sequence_view in ["cine_sax", "cine_4ch", "cine_3ch"]:
+        if sequence_view in _CINE_VIEWS:
             # Handle special case for Valves field
             if field == "Valves":
-                question_lower = question.lower()
-                if "mitral" in question_lower or "二尖瓣" in question or "mitral valve" in question_lower:
-                    field_key = "Mitral Regurgitation"
-                elif "tricuspid" in question_lower or "三尖瓣" in question or "tricuspid valve" in question_lower:
-                    field_key = "Tricuspid Regurgitation"
-                elif "aortic" in question_lower or "主动脉瓣" in question or "aortic valve" in question_lower:
-                    field_key = "Aortic Regurgitation"
-                else:
+                field_key = _match_field_key(_VALVE_FIELD_PATTERNS, question)
+                if field_key is None:
                     return None
             # Handle special case for Effusion field
             elif field == "Effusion":
-                question_lower = question.lower()
-                if "pericardial" in question_lower or "心包" in question or "pericardial effusion" in question_lower:
-                    field_key = "Pericardial Effusion"
-                elif "pleural" in question_lower or "胸腔" in question or "pleural effusion" in question_lower:
-                    field_key = "Pleural Effusion"
-                else:
+                field_key = _match_field_key(_EFFUSION_FIELD_PATTERNS, question)
+                if field_key is None:
                     return None
             else:
                 field_key = field
         else:
             field_key = field
         
+        return TestModelPromptGenerator._assemble_specific_prompt(
+            field_key, sequence_view, is_multiple_choice, include_reason
+        )
+    
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _assemble_specific_prompt(field_key: str,
+                                  sequence_view: str,
+                                  is_multiple_choice: bool,
+                                  include_reason: bool) -> Optional[str]:
+        """
+        Build the final specific prompt for a resolved field key (cached)
+        
+        The result depends only on the arguments, not on the question text,
+        so the reason-template rewriting runs once per prompt variant.
+        
+        Args:
+            field_key: Field name after Valves/Effusion resolution
+            sequence_view: Sequence view
+            is_multiple_choice: Whether it is multiple choice
+            include_reason: Whether to include reason template
+            
+        Returns:
+            Returns matched specific prompt if found, otherwise None
+        """
         # Find matching prompt
         key = (field_key, sequence_view, is_multiple_choice, "prompt")
-        if key in prompt_dict:
-            base_prompt = prompt_dict[key]
+        base_prompt = _ALL_SPECIFIC_PROMPTS.get(key)
+        if base_prompt is None:
+            return None
+        
+        # If reason needs to be included, modify prompt
+        if include_reason:
+            # For CINE prompts, need to modify the "Do NOT output explanations" rule
+            if sequence_view in _CINE_VIEWS:
+                # Remove the "Do NOT output explanations, reasoning..." rule
+                base_prompt = re.sub(
+                    r'- Do NOT output explanations, reasoning, descriptions, confidence, or any extra characters \(commas allowed\)\.\s*\n',
+                    '',
+                    base_prompt
+                )
+                # Add output format requirement for reason
+                # Find the position after "Strict rules:" or before "Options:"
+                if "Strict rules:" in base_prompt and "Options:" in base_prompt:
+                    # Insert reason format requirement before Options
+                    parts = base_prompt.split("Options:")
+                    if len(parts) == 2:
+                        # Check if output format is already specified
+                        if "Output format:" not in parts[0] and "Output MUST be" not in parts[0]:
+                            # Add output format requirement
+                            parts[0] += "\n\n- Output format:\n  - Line 1: Answer letter(s) only (e.g., A or A,B)\n  - Line 2: \"Reason: [your explanation]\""
+                        base_prompt = parts[0] + "\n\nOptions:" + parts[1]
+                elif "Options:" in base_prompt:
+                    # Insert before Options
+                    parts = base_prompt.split("Options:")
+                    if len(parts) == 2:
+                        if "Output format:" not in parts[0]:
+                            parts[0] += "\n\n- Output format:\n  - Line 1: Answer letter(s) only (e.g., A or A,B)\n  - Line 2: \"Reason: [your explanation]\""
+                        base_prompt = parts[0] + "\n\nOptions:" + parts[1]
+                else:
+                    # Append at the end
+                    if "Output format:" not in base_prompt:
+                        base_prompt += "\n\n- Output format:\n  - Line 1: Answer letter(s) only (e.g., A or A,B)\n  - Line 2: \"Reason: [your explanation]\""
             
-            # If reason needs to be included, modify prompt
-            if include_reason:
-                # For CINE prompts, need to modify the "Do NOT output explanations" rule
-                if sequence_view in ["cine_sax", "cine_4ch", "cine_3ch"]:
-                    # Remove the "Do NOT output explanations, reasoning..." rule
-                    base_prompt = re.sub(
-                        r'- Do NOT output explanations, reasoning, descriptions, confidence, or any extra characters \(commas allowed\)\.\s*\n',
-                        '',
-                        base_prompt
-                    )
-                    # Add output format requirement for reason
-                    # Find the position after "Strict rules:" or before "Options:"
-                    if "Strict rules:" in base_prompt and "Options:" in base_prompt:
-                        # Insert reason format requirement before Options
-                        parts = base_prompt.split("Options:")
-                        if len(parts) == 2:
-                            # Check if output format is already specified
-                            if "Output format:" not in parts[0] and "Output MUST be" not in parts[0]:
-                                # Add output format requirement
-                                parts[0] += "\n\n- Output format:\n  - Line 1: Answer letter(s) only (e.g., A or A,B)\n  - Line 2: \"Reason: [your explanation]\""
-                            base_prompt = parts[0] + "\n\nOptions:" + parts[1]
-                    elif "Options:" in base_prompt:
-                        # Insert before Options
-                        parts = base_prompt.split("Options:")
-                        if len(parts) == 2:
-                            if "Output format:" not in parts[0]:
-                                parts[0] += "\n\n- Output format:\n  - Line 1: Answer letter(s) only (e.g., A or A,B)\n  - Line 2: \"Reason: [your explanation]\""
-                            base_prompt = parts[0] + "\n\nOptions:" + parts[1]
-                    else:
-                        # Append at the end
-                        if "Output format:" not in base_prompt:
-                            base_prompt += "\n\n- Output format:\n  - Line 1: Answer letter(s) only (e.g., A or A,B)\n  - Line 2: \"Reason: [your explanation]\""
-                
-                # Get reason template for this field
-                reason_template = TestModelPromptGenerator.get_reason_template(field_key, sequence_view, is_multiple_choice)
-                
-                if reason_template:
-                    # The v2 prompts already have format instructions in the prompt text
-                    # We need to add the reason template framework before the Options section
-                    # Insert reason template before "Options:" section
-                    if "Options:" in base_prompt:
-                        parts = base_prompt.split("Options:")
-                        if len(parts) == 2:
-                            base_prompt = parts[0] + f"\n\nWhen providing your reason, please follow this analysis framework:\n{reason_template}\n\nOptions:" + parts[1]
-                    else:
-                        # If no Options section, append at the end
-                        base_prompt += f"\n\nWhen providing your reason, please follow this analysis framework:\n{reason_template}"
+            # Get reason template for this field
+            reason_template = TestModelPromptGenerator.get_reason_template(field_key, sequence_view, is_multiple_choice)
             
-            return base_prompt
+            if reason_template:
+                # The v2 prompts already have format instructions in the prompt text
+                # We need to add the reason template framework before the Options section
+                # Insert reason template before "Options:" section
+                if "Options:" in base_prompt:
+                    parts = base_prompt.split("Options:")
+                    if len(parts) == 2:
+                        base_prompt = parts[0] + f"\n\nWhen providing your reason, please follow this analysis framework:\n{reason_template}\n\nOptions:" + parts[1]
+                else:
+                    # If no Options section, append at the end
+                    base_prompt += f"\n\nWhen providing your reason, please follow this analysis framework:\n{reason_template}"
         
-        return None
+        return base_prompt
     
     @staticmethod
     def get_cine_specific_prompt(field: str,
@@ -1344,6 +1310,7 @@ Answer:"""
         )
     
     @staticmethod
+    @lru_cache(maxsize=4096)
     def generate(sequence_view: str,
                  question_type: str,
                  is_multiple_choice: bool,
@@ -1354,6 +1321,9 @@ Answer:"""
         """
         Unified generation interface
         
+        Results are memoized, so regenerating the prompt for the same question
+        (e.g. when several models are evaluated in one process) is a lookup.
+        
         Args:
             sequence_view: Sequence view string
             question_type: Question type string
@@ -1363,9 +1333,8 @@ Answer:"""
             is_short_answer: Whether it is short answer
         """
         # If sequence has field information and supports specific prompts, try to use specific prompt
-        supported_sequences = ["cine_sax", "cine_4ch", "cine_3ch", "LGE_sax", "LGE_4ch", "perfusion", "T2_sax"]
         if (field and 
-            sequence_view in supported_sequences and 
+            sequence_view in _SPECIFIC_PROMPT_VIEWS and 
             not is_short_answer and 
             question_type != "Short Answer"):
             
@@ -1379,10 +1348,7 @@ Answer:"""
                 return specific_prompt
         
         # Otherwise use generic prompt
-        try:
-            seq_enum = SequenceView(sequence_view)
-        except ValueError:
-            seq_enum = SequenceView.CINE_SAX  # Default value
+        seq_enum = _resolve_sequence_view(sequence_view)
         
         if is_short_answer or question_type == "Short Answer":
             return TestModelPromptGenerator.get_short_answer_prompt(seq_enum, question)
@@ -1391,14 +1357,80 @@ Answer:"""
                 seq_enum, is_multiple_choice, question, include_reason
             )
 
+# Assemble every include_reason variant at import so prompt generation is a cache hit
+for _key in _ALL_SPECIFIC_PROMPTS:
+    TestModelPromptGenerator._assemble_specific_prompt(_key[0], _key[1], _key[2], True)
+del _key
+
 # ==================== Judge Model Prompt Templates ====================
+def _build_judge_choice_criteria(is_multiple_choice: bool) -> str:
+    """Evaluation criteria block of the choice judge prompt"""
+    choice_type = "multiple choice" if is_multiple_choice else "single choice"
+    evaluation_criteria = f"""
+Evaluation Criteria:
+1. Extract the option letters (A, B, C, etc.) from both the ground truth and predicted answer
+2. For {choice_type} questions:
+   - {"Compare the sets of selected options. The answer is correct ONLY if the predicted answer contains EXACTLY the same options as the ground truth (order does not matter)." if is_multiple_choice else "The answer is correct ONLY if the predicted answer matches the ground truth exactly."}
+3. Consider partial credit for multiple choice: if some but not all options are correct, note this in your evaluation
+4. Be strict: minor variations in wording (e.g., "A. Normal" vs "A.Normal") should be considered equivalent, but missing or extra options are errors"""
+    
+    if is_multiple_choice:
+        evaluation_criteria += """
+5. For multiple choice questions, partial matches should be noted but not considered fully correct"""
+    
+    return evaluation_criteria
+
+# Criteria for single (False) and multiple (True) choice, formatted once
+_JUDGE_CHOICE_CRITERIA = {
+    is_mc: _build_judge_choice_criteria(is_mc) for is_mc in (False, True)
+}
+
+_JUDGE_CHOICE_RESPONSE_FORMAT = """Please evaluate the answer and provide your judgment in the following JSON format:
+{
+    "is_correct": true/false,
+    "reasoning": "brief explanation of why the answer is correct or incorrect",
+    "extracted_ground_truth": ["A", "B", ...],
+    "extracted_predicted": ["A", "B", ...],
+    "match_type": "exact_match" | "partial_match" | "no_match",
+    "precision": 0.0-1.0 (for multiple choice: correct options / total predicted options),
+    "recall": 0.0-1.0 (for multiple choice: correct options / total ground truth options),
+    "f1_score": 0.0-1.0
+}"""
+
+_JUDGE_SHORT_ANSWER_CRITERIA = """Evaluation Criteria:
+1. Semantic Correctness: Does the predicted answer convey the same medical meaning as the ground truth?
+2. Key Information: Are all critical findings mentioned in the ground truth also present in the predicted answer?
+3. Accuracy: Are the medical facts correct?
+4. Completeness: Is the answer sufficiently complete (not missing important details)?
+5. Terminology: Is appropriate medical terminology used?
+
+Scoring Guidelines:
+- Fully Correct (score: 1.0): Answer is medically accurate, complete, and semantically equivalent to ground truth
+- Mostly Correct (score: 0.7-0.9): Answer is mostly correct but missing minor details or has minor inaccuracies
+- Partially Correct (score: 0.4-0.6): Answer contains some correct information but is incomplete or has significant gaps
+- Mostly Incorrect (score: 0.1-0.3): Answer has some correct elements but is largely wrong or missing key information
+- Completely Incorrect (score: 0.0): Answer is medically incorrect or irrelevant"""
+
+_JUDGE_SHORT_ANSWER_RESPONSE_FORMAT = """Please evaluate the answer and provide your judgment in the following JSON format:
+{
+    "is_correct": true/false (true if score >= 0.7),
+    "score": 0.0-1.0,
+    "reasoning": "detailed explanation of the evaluation",
+    "key_points_ground_truth": ["point1", "point2", ...],
+    "key_points_predicted": ["point1", "point2", ...],
+    "missing_information": ["missing point1", ...],
+    "incorrect_information": ["incorrect point1", ...],
+    "semantic_similarity": 0.0-1.0
+}"""
+
 class JudgeModelPromptGenerator:
     """Judge model prompt generator (for evaluating whether answers are correct)"""
     
     @staticmethod
-    def get_base_prompt(sequence_view: SequenceView) -> str:
-        """Get base prompt"""
-        seq_info = SEQUENCE_DESCRIPTIONS[sequence_view]
+    @lru_cache(maxsize=None)
+    def get_base_prompt(sequence_view: Union[SequenceView, str]) -> str:
+        """Get base prompt (built once per sequence view; accepts a SequenceView or its string value)"""
+        seq_info = SEQUENCE_DESCRIPTIONS[_SEQUENCE_VIEWS.get(sequence_view, sequence_view)]
         return f"""You are an expert cardiac MRI radiologist evaluating answers to questions about {seq_info['name']} images.
 
 Sequence Information:
@@ -1427,17 +1459,7 @@ Your task is to evaluate whether the provided answer is correct based on the gro
         base = JudgeModelPromptGenerator.get_base_prompt(sequence_view)
         
         choice_type = "multiple choice" if is_multiple_choice else "single choice"
-        evaluation_criteria = f"""
-Evaluation Criteria:
-1. Extract the option letters (A, B, C, etc.) from both the ground truth and predicted answer
-2. For {choice_type} questions:
-   - {"Compare the sets of selected options. The answer is correct ONLY if the predicted answer contains EXACTLY the same options as the ground truth (order does not matter)." if is_multiple_choice else "The answer is correct ONLY if the predicted answer matches the ground truth exactly."}
-3. Consider partial credit for multiple choice: if some but not all options are correct, note this in your evaluation
-4. Be strict: minor variations in wording (e.g., "A. Normal" vs "A.Normal") should be considered equivalent, but missing or extra options are errors"""
-        
-        if is_multiple_choice:
-            evaluation_criteria += """
-5. For multiple choice questions, partial matches should be noted but not considered fully correct"""
+        evaluation_criteria = _JUDGE_CHOICE_CRITERIA[bool(is_multiple_choice)]
         
         instruction = f"""
 Question Type: {choice_type.upper()}
@@ -1453,17 +1475,7 @@ Predicted Answer:
 
 {evaluation_criteria}
 
-Please evaluate the answer and provide your judgment in the following JSON format:
-{{
-    "is_correct": true/false,
-    "reasoning": "brief explanation of why the answer is correct or incorrect",
-    "extracted_ground_truth": ["A", "B", ...],
-    "extracted_predicted": ["A", "B", ...],
-    "match_type": "exact_match" | "partial_match" | "no_match",
-    "precision": 0.0-1.0 (for multiple choice: correct options / total predicted options),
-    "recall": 0.0-1.0 (for multiple choice: correct options / total ground truth options),
-    "f1_score": 0.0-1.0
-}}
+{_JUDGE_CHOICE_RESPONSE_FORMAT}
 
 Your evaluation:"""
         
@@ -1497,31 +1509,9 @@ Ground Truth Answer:
 Predicted Answer:
 {predicted_answer}
 
-Evaluation Criteria:
-1. Semantic Correctness: Does the predicted answer convey the same medical meaning as the ground truth?
-2. Key Information: Are all critical findings mentioned in the ground truth also present in the predicted answer?
-3. Accuracy: Are the medical facts correct?
-4. Completeness: Is the answer sufficiently complete (not missing important details)?
-5. Terminology: Is appropriate medical terminology used?
-
-Scoring Guidelines:
-- Fully Correct (score: 1.0): Answer is medically accurate, complete, and semantically equivalent to ground truth
-- Mostly Correct (score: 0.7-0.9): Answer is mostly correct but missing minor details or has minor inaccuracies
-- Partially Correct (score: 0.4-0.6): Answer contains some correct information but is incomplete or has significant gaps
-- Mostly Incorrect (score: 0.1-0.3): Answer has some correct elements but is largely wrong or missing key information
-- Completely Incorrect (score: 0.0): Answer is medically incorrect or irrelevant
+{_JUDGE_SHORT_ANSWER_CRITERIA}
 
-Please evaluate the answer and provide your judgment in the following JSON format:
-{{
-    "is_correct": true/false (true if score >= 0.7),
-    "score": 0.0-1.0,
-    "reasoning": "detailed explanation of the evaluation",
-    "key_points_ground_truth": ["point1", "point2", ...],
-    "key_points_predicted": ["point1", "point2", ...],
-    "missing_information": ["missing point1", ...],
-    "incorrect_information": ["incorrect point1", ...],
-    "semantic_similarity": 0.0-1.0
-}}
+{_JUDGE_SHORT_ANSWER_RESPONSE_FORMAT}
 
 Your evaluation:"""
         
@@ -1547,10 +1537,7 @@ Your evaluation:"""
             predicted_answer: Predicted answer
             is_short_answer: Whether it is short answer
         """
-        try:
-            seq_enum = SequenceView(sequence_view)
-        except ValueError:
-            seq_enum = SequenceView.CINE_SAX  # Default value
+        seq_enum = _resolve_sequence_view(sequence_view)
         
         if is_short_answer or question_type == "Short Answer":
             return JudgeModelPromptGenerator.get_short_answer_judge_prompt(
@@ -3,11 +3,89 @@
 Script to regenerate summary.json from detailed_results.json
 """
 
-import json
 import sys
 from pathlib import Path
 from collections import defaultdict
 
+from json_io import load_json, dump_json
+
+# Optional streaming JSON parser for very large result files
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Files at least this large are stream-parsed (when ijson is installed)
+STREAM_THRESHOLD_BYTES = 32 * 1024 * 1024
+
+# Parse errors raised mid-stream by ijson (it rejects NaN/Infinity, which json.dump writes)
+_STREAM_ERRORS = (ijson.JSONError,) if ijson is not None else ()
+
+def _iter_results(detailed_file, stream: bool = True):
+    """
+    Iterate over the result items of a detailed_results.json file
+    
+    Large files are stream-parsed with ijson so only one item is held in
+    memory at a time; smaller files are loaded in one go (with orjson when
+    available), which is faster than ijson's per-event overhead.
+    
+    Args:
+        detailed_file: Path to detailed_results.json
+        stream: Allow stream-parsing of large files
+        
+    Returns:
+        Iterator over result dictionaries
+    """
+    if stream and ijson is not None and detailed_file.stat().st_size >= STREAM_THRESHOLD_BYTES:
+        with open(detailed_file, 'rb') as f:
+            yield from ijson.items(f, 'item', use_float=True)
+        return
+    
+    yield from load_json(detailed_file)
+
+def _aggregate(results):
+    """
+    Count totals, correct answers and hits per field, sequence view and question type
+    
+    Args:
+        results: Iterable of result dictionaries
+        
+    Returns:
+        (total, correct, per_field, per_sequence_view, per_question_type)
+    """
+    # Statistics containers
+    total = 0
+    correct = 0
+    
+    per_field = defaultdict(lambda: {'total': 0, 'correct': 0, 'hit': 0})
+    per_sequence_view = defaultdict(lambda: {'total': 0, 'correct': 0, 'hit': 0})
+    per_question_type = defaultdict(lambda: {'total': 0, 'correct': 0, 'hit': 0})
+    
+    # Process each result in a single pass, updating all three groupings
+    for result in results:
+        q_type = result.get('question_type', '')
+        is_correct = 1 if result.get('is_correct', False) else 0
+        hit = result.get('hit', 0.0) if q_type == 'Multiple Choice' else 0
+        total += 1
+        correct += is_correct
+    
+        for stats in (per_field[result.get('field', '')],
+                      per_sequence_view[result.get('sequence_view', '')],
+                      per_question_type[q_type]):
+            stats['total'] += 1
+            stats['correct'] += is_correct
+            stats['hit'] += hit
+    
+    return total, correct, per_field, per_sequence_view, per_question_type
+
+def _finalize(groups):
+    """Turn per-group totals into accuracy and average hit, returning a plain dict"""
+    for stats in groups.values():
+        t = stats['total']
+        stats['accuracy'] = stats['correct'] / t
+        stats['hit'] /= t
+    return dict(groups)
+
 def regenerate_summary(detailed_results_file):
     """Regenerate summary.json from detailed_results.json"""
     detailed_file = Path(detailed_results_file)
@@ -20,58 +98,14 @@ def regenerate_summary(detailed_results_file):
     print(f"Reading: {detailed_file}")
     
     try:
-        with open(detailed_file, 'r', encoding='utf-8') as f:
-            results = json.load(f)
-        
-        # Statistics containers
-        total = len(results)
-        correct = sum(1 for r in results if r.get('is_correct', False))
-        
-        per_field = defaultdict(lambda: {'total': 0, 'correct': 0, 'hit': 0})
-        per_sequence_view = defaultdict(lambda: {'total': 0, 'correct': 0, 'hit': 0})
-        per_question_type = defaultdict(lambda: {'total': 0, 'correct': 0, 'hit': 0})
-        
-        # Process each result
-        for result in results:
-            field = result.get('field', '')
-            seq_view = result.get('sequence_view', '')
-            q_type = result.get('question_type', '')
-            is_correct = result.get('is_correct', False)
-            is_multiple = result.get('question_type') == 'Multiple Choice'
-            
-            per_field[field]['total'] += 1
-            per_field[field]['correct'] += (1 if is_correct else 0)
-            if is_multiple:
-                per_field[field]['hit'] += result.get('hit', 0.0)
-            
-            per_sequence_view[seq_view]['total'] += 1
-            per_sequence_view[seq_view]['correct'] += (1 if is_correct else 0)
-            if is_multiple:
-                per_sequence_view[seq_view]['hit'] += result.get('hit', 0.0)
-            
-            per_question_type[q_type]['total'] += 1
-            per_question_type[q_type]['correct'] += (1 if is_correct else 0)
-            if is_multiple:
-                per_question_type[q_type]['hit'] += result.get('hit', 0.0)
-        
-        # Calculate average metrics
-        for key in per_field:
-            if per_field[key]['total'] > 0:
-                per_field[key]['accuracy'] = per_field[key]['correct'] / per_field[key]['total']
-                if per_field[key]['total'] > 0 and 'hit' in per_field[key]:
-                    per_field[key]['hit'] /= per_field[key]['total']
-        
-        for key in per_sequence_view:
-            if per_sequence_view[key]['total'] > 0:
-                per_sequence_view[key]['accuracy'] = per_sequence_view[key]['correct'] / per_sequence_view[key]['total']
-                if per_sequence_view[key]['total'] > 0 and 'hit' in per_sequence_view[key]:
-                    per_sequence_view[key]['hit'] /= per_sequence_view[key]['total']
-        
-        for key in per_question_type:
-            if per_question_type[key]['total'] > 0:
-                per_question_type[key]['accuracy'] = per_question_type[key]['correct'] / per_question_type[key]['total']
-                if per_question_type[key]['total'] > 0 and 'hit' in per_question_type[key]:
-                    per_question_type[key]['hit'] /= per_question_type[key]['total']
+        try:
+            total, correct, per_field, per_sequence_view, per_question_type = _aggregate(
+                _iter_results(detailed_file))
+        except _STREAM_ERRORS as e:
+            # The streaming parser gave up part-way; start over with a full load
+            print(f"Warning: Streaming parse failed ({e}), loading the whole file instead")
+            total, correct, per_field, per_sequence_view, per_question_type = _aggregate(
+                _iter_results(detailed_file, stream=False))
         
         # Create summary
         summary = {
@@ -80,14 +114,13 @@ def regenerate_summary(detailed_results_file):
                 'correct': correct,
                 'accuracy': correct / total if total > 0 else 0.0
             },
-            'per_field': dict(per_field),
-            'per_sequence_view': dict(per_sequence_view),
-            'per_question_type': dict(per_question_type)
+            'per_field': _finalize(per_field),
+            'per_sequence_view': _finalize(per_sequence_view),
+            'per_question_type': _finalize(per_question_type)
         }
         
         # Save summary
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, ensure_ascii=False, indent=2)
+        dump_json(summary, summary_file)
         
         print(f"Regenerated: {summary_file}")
         print(f"  Total: {total}, Correct: {correct}, Accuracy: {summary['overall']['accuracy']:.4f}")
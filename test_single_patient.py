@@ -4,8 +4,10 @@ Test script for a single patient's all questions
 Tests all questions for a single patient and checks for bugs
 """
 
+import os
 import sys
 import json
+from collections import Counter
 from pathlib import Path
 from evaluate_benchmark import BenchmarkDataLoader, BenchmarkEvaluator, EvaluationResult
 from model_apis import ModelFactory
@@ -47,11 +49,17 @@ def test_single_patient(patient_id: str,
         print(f"Error: Patient JSON file not found for patient {patient_id}")
         print(f"Looking in: {dataset_dir}")
         print(f"Available files:")
-        for f in dataset_dir.glob("patient_*_vqa_png.json"):
-            print(f"  - {f.name}")
-        for f in dataset_dir.rglob("patient_*_vqa_png.json"):
-            if f.parent != dataset_dir:
-                print(f"  - {f.relative_to(dataset_dir)}")
+        # One directory walk; top-level files are listed before nested ones
+        nested = []
+        for root, _dirs, files in os.walk(dataset_dir):
+            for name in files:
+                if name.startswith("patient_") and name.endswith("_vqa_png.json"):
+                    if root == str(dataset_dir):
+                        print(f"  - {name}")
+                    else:
+                        nested.append(os.path.relpath(os.path.join(root, name), dataset_dir))
+        for rel_path in nested:
+            print(f"  - {rel_path}")
         return False
     
     print(f"Found patient JSON file: {json_file}")
@@ -135,10 +143,13 @@ def test_single_patient(patient_id: str,
         return False
     
     # Show question breakdown
-    from collections import Counter
-    sequence_counts = Counter(q.sequence_view for q in questions)
-    field_counts = Counter(q.field for q in questions)
-    type_counts = Counter(q.question_type for q in questions)
+    sequence_counts = Counter()
+    field_counts = Counter()
+    type_counts = Counter()
+    for q in questions:
+        sequence_counts[q.sequence_view] += 1
+        field_counts[q.field] += 1
+        type_counts[q.question_type] += 1
     
     print("\nQuestion breakdown:")
     print(f"  By sequence view: {dict(sequence_counts)}")
@@ -202,8 +213,25 @@ def test_single_patient(patient_id: str,
         
         bugs_found = []
         
+        # Collect all checks in a single pass over the results
+        empty_answers = []
+        missing_reasons = []
+        inconsistent = []
+        missing_hit = []
+        for r in result.detailed_results:
+            if not r.get('answer', '').strip():
+                empty_answers.append(r)
+            if include_reason and not r.get('reason', '').strip():
+                missing_reasons.append(r)
+            if r.get('is_correct', False):
+                if r.get('accuracy', 0.0) == 0.0:
+                    inconsistent.append(r)
+            elif r.get('accuracy', 1.0) == 1.0:
+                inconsistent.append(r)
+            if r.get('question_type') == 'Multiple Choice' and 'hit' not in r:
+                missing_hit.append(r)
+        
         # Check 1: Empty answers
-        empty_answers = [r for r in result.detailed_results if not r.get('answer', '').strip()]
         if empty_answers:
             bugs_found.append(f"Found {len(empty_answers)} questions with empty answers")
             print(f"Warning: {len(empty_answers)} questions have empty answers")
@@ -211,18 +239,13 @@ def test_single_patient(patient_id: str,
                 print(f"    - QID: {r['qid']}, Field: {r['field']}")
         
         # Check 2: Missing reasons when include_reason=True
-        if include_reason:
-            missing_reasons = [r for r in result.detailed_results if not r.get('reason', '').strip()]
-            if missing_reasons:
-                bugs_found.append(f"Found {len(missing_reasons)} questions with missing reasons")
-                print(f"Warning: {len(missing_reasons)} questions have missing reasons")
-                for r in missing_reasons[:5]:  # Show first 5
-                    print(f"    - QID: {r['qid']}, Field: {r['field']}")
+        if missing_reasons:
+            bugs_found.append(f"Found {len(missing_reasons)} questions with missing reasons")
+            print(f"Warning: {len(missing_reasons)} questions have missing reasons")
+            for r in missing_reasons[:5]:  # Show first 5
+                print(f"    - QID: {r['qid']}, Field: {r['field']}")
         
         # Check 3: Inconsistent accuracy
-        inconsistent = [r for r in result.detailed_results 
-                       if (r.get('is_correct', False) and r.get('accuracy', 0.0) == 0.0) or
-                          (not r.get('is_correct', False) and r.get('accuracy', 1.0) == 1.0)]
         if inconsistent:
             bugs_found.append(f"Found {len(inconsistent)} questions with inconsistent accuracy")
             print(f"Warning: {len(inconsistent)} questions have inconsistent accuracy/is_correct")
@@ -230,8 +253,6 @@ def test_single_patient(patient_id: str,
                 print(f"    - QID: {r['qid']}, is_correct: {r['is_correct']}, accuracy: {r['accuracy']}")
         
         # Check 4: Missing hit for multiple choice
-        missing_hit = [r for r in result.detailed_results 
-                      if r.get('question_type') == 'Multiple Choice' and 'hit' not in r]
         if missing_hit:
             bugs_found.append(f"Found {len(missing_hit)} multiple choice questions without hit metric")
             print(f"Warning: {len(missing_hit)} multiple choice questions missing 'hit' metric")
@@ -0,0 +1,64 @@
+"""
+Tests for evaluate_benchmark concurrency control
+Run with: python -m unittest discover -s tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from evaluate_benchmark import AdaptiveLimiter
+from model_apis import BaseModelAPI, ResponseStatusError
+
+
+class _FlakyModel(BaseModelAPI):
+    """Model whose call fails with the given errors before succeeding"""
+    
+    retry_delay = 0
+    
+    def __init__(self, errors):
+        super().__init__(api_key="test", base_url="test://limiter")
+        self.errors = list(errors)
+    
+    def predict(self, images, prompt, **kwargs):
+        def _call():
+            if self.errors:
+                raise self.errors.pop(0)
+            return "Answer: A"
+        return self._retry_call(_call, "Test API")
+
+
+class AdaptiveLimiterTest(unittest.TestCase):
+    
+    def test_retried_rate_limit_still_throttles(self):
+        limiter = AdaptiveLimiter(8, decrease_interval=0)
+        model = _FlakyModel([ResponseStatusError(429, "slow down")])
+        model.on_rate_limit = limiter.throttle
+        
+        self.assertEqual(limiter.call(model.predict, [], "prompt"), "Answer: A")
+        self.assertEqual(limiter.limit, 4)
+    
+    def test_burst_counts_as_one_decrease(self):
+        limiter = AdaptiveLimiter(8, decrease_interval=60)
+        for _ in range(5):
+            limiter.throttle()
+        self.assertEqual(limiter.limit, 4)
+    
+    def test_successes_raise_limit(self):
+        limiter = AdaptiveLimiter(4, increase_after=2, decrease_interval=0)
+        limiter.throttle()
+        for _ in range(2):
+            limiter.call(lambda: "ok")
+        self.assertEqual(limiter.limit, 3)
+    
+    def test_error_output_is_not_a_success(self):
+        limiter = AdaptiveLimiter(4, increase_after=1, decrease_interval=0)
+        limiter.throttle()
+        limiter.call(lambda: "Error: boom")
+        self.assertEqual(limiter.limit, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
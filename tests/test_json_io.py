@@ -0,0 +1,72 @@
+"""
+Tests for the shared JSON helpers and the scripts that rewrite result files
+Run with: python -m unittest discover -s tests
+"""
+
+import json
+import math
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import json_io
+from fix_results import fix_results_file
+from regenerate_summary import regenerate_summary
+
+
+class JsonIOTest(unittest.TestCase):
+    
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_dir = Path(self._tmp_dir.name)
+    
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+    
+    def test_non_finite_detection(self):
+        self.assertFalse(json_io._has_non_finite([{'a': 1.0, 'b': [0.5, None, "NaN"]}]))
+        self.assertTrue(json_io._has_non_finite([{'a': [1.0, float('nan')]}]))
+        self.assertTrue(json_io._has_non_finite({'a': (float('-inf'),)}))
+    
+    def test_nan_and_wide_int_round_trip(self):
+        data = [{'precision': float('nan'), 'recall': float('inf'), 'qid': 2 ** 70}]
+        json_file = self.tmp_dir / "data.json"
+        json_io.dump_json(data, json_file)
+        
+        loaded = json_io.load_json(json_file)
+        self.assertTrue(math.isnan(loaded[0]['precision']))
+        self.assertEqual(loaded[0]['recall'], float('inf'))
+        self.assertEqual(loaded[0]['qid'], 2 ** 70)
+    
+    def test_fix_results_keeps_nan_fields(self):
+        json_file = self.tmp_dir / "detailed_results.json"
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump([{'qid': 'q1', 'is_correct': True, 'accuracy': 0.0, 'precision': float('nan')}], f)
+        
+        self.assertTrue(fix_results_file(json_file, log=lambda *args: None))
+        
+        with open(json_file, 'r', encoding='utf-8') as f:
+            fixed = json.load(f)
+        self.assertEqual(fixed[0]['accuracy'], 1.0)
+        self.assertTrue(math.isnan(fixed[0]['precision']))
+
+    
+    def test_regenerate_summary_keeps_nan_hit(self):
+        json_file = self.tmp_dir / "detailed_results.json"
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump([{'field': 'f', 'sequence_view': 'LGE_sax', 'question_type': 'Multiple Choice',
+                        'is_correct': True, 'hit': float('nan')}], f)
+        
+        self.assertTrue(regenerate_summary(json_file))
+        
+        with open(self.tmp_dir / "summary.json", 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+        self.assertEqual(summary['overall']['correct'], 1)
+        self.assertTrue(math.isnan(summary['per_field']['f']['hit']))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,319 @@
+"""
+Tests for model_apis helpers that do not need network access
+Run with: python -m unittest discover -s tests
+"""
+
+import asyncio
+import base64
+import gzip
+import os
+import random
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import model_apis
+
+
+class ImageExistsTest(unittest.TestCase):
+    
+    def test_missing_image_is_found_once_created(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            image_path = os.path.join(tmp_dir, "late.png")
+            self.assertFalse(model_apis._image_exists(image_path))
+            
+            Path(image_path).write_bytes(b"\x89PNG\r\n\x1a\n")
+            self.assertTrue(model_apis._image_exists(image_path))
+
+
+class _FakeCompletions:
+    """Stands in for client.chat.completions; returns queued replies and counts calls"""
+    
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = 0
+        self.requests = []
+    
+    def create(self, **kwargs):
+        self.calls += 1
+        self.requests.append(kwargs)
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        message = SimpleNamespace(content=reply)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _gpt_model_with_fake_client(replies):
+    model = model_apis.GPTModelAPI(api_key="test", model="fake-model")
+    completions = _FakeCompletions(replies)
+    model.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return model, completions
+
+
+class ResponseCacheTest(unittest.TestCase):
+    
+    def test_repeated_request_is_served_from_cache(self):
+        model, completions = _gpt_model_with_fake_client(["Answer: A", "Answer: B"])
+        model.response_cache = model_apis.ResponseCache(maxsize=8)
+        
+        self.assertEqual(model.predict([], "Question 1"), "Answer: A")
+        self.assertEqual(model.predict([], "Question 1"), "Answer: A")
+        self.assertEqual(model.predict([], "Question 2"), "Answer: B")
+        
+        self.assertEqual(completions.calls, 2)
+        self.assertEqual(model.response_cache.hits, 1)
+        self.assertEqual(model.response_cache.misses, 2)
+    
+    def test_options_and_opt_out_bypass_cached_answer(self):
+        model, completions = _gpt_model_with_fake_client(["cold", "warm", "fresh"])
+        model.response_cache = model_apis.ResponseCache(maxsize=8)
+        
+        self.assertEqual(model.predict([], "Question"), "cold")
+        self.assertEqual(model.predict([], "Question", temperature=1.0), "warm")
+        self.assertEqual(model.predict([], "Question", use_cache=False), "fresh")
+        self.assertEqual(completions.calls, 3)
+    
+    def test_errors_are_not_cached(self):
+        model, completions = _gpt_model_with_fake_client([ValueError("bad request"), "", "Answer: C"])
+        model.response_cache = model_apis.ResponseCache(maxsize=8)
+        
+        self.assertTrue(model.predict([], "Question").startswith("Error:"))
+        self.assertEqual(model.predict([], "Question"), "")
+        self.assertEqual(model.predict([], "Question"), "Answer: C")
+        self.assertEqual(completions.calls, 3)
+        self.assertEqual(len(model.response_cache), 1)
+    
+    def test_lru_eviction(self):
+        cache = model_apis.ResponseCache(maxsize=2)
+        for key in (b"a", b"b", b"c"):
+            cache.put(key, key.decode())
+        self.assertIsNone(cache.get(b"a"))
+        self.assertEqual(cache.get(b"c"), "c")
+
+
+class PredictPrebuiltTest(unittest.TestCase):
+    
+    def test_prebuilt_messages_are_reused_across_calls(self):
+        model, completions = _gpt_model_with_fake_client(["Answer: A", "Answer: B"])
+        messages = model.build_messages([], "Question", system_message="Be brief")
+        
+        self.assertEqual(model.predict_prebuilt(messages), "Answer: A")
+        self.assertEqual(model.predict_prebuilt(messages, temperature=1.0), "Answer: B")
+        self.assertEqual(completions.calls, 2)
+        for request in completions.requests:
+            self.assertEqual(request["messages"], messages)
+        self.assertEqual(completions.requests[0]["temperature"], model.temperature)
+        self.assertEqual(completions.requests[1]["temperature"], 1.0)
+    
+    def test_prebuilt_matches_predict_request(self):
+        model, completions = _gpt_model_with_fake_client(["Answer: A", "Answer: A"])
+        messages = model.build_messages([], "Question")
+        
+        self.assertEqual(model.predict([], "Question"), model.predict_prebuilt(messages))
+        self.assertEqual(completions.requests[0], completions.requests[1])
+
+
+class GzipTransportTest(unittest.TestCase):
+    
+    def _send(self, body):
+        import httpx
+        seen = {}
+        
+        def handler(request):
+            seen['headers'] = request.headers
+            seen['content'] = request.read()
+            return httpx.Response(200)
+        
+        transport = model_apis._GzipTransport(httpx.MockTransport(handler))
+        with httpx.Client(transport=transport) as client:
+            client.post("https://api.example.com/v1/chat/completions", content=body)
+        return seen
+    
+    def test_large_body_is_compressed(self):
+        body = b"x" * model_apis._GZIP_MIN_BYTES
+        seen = self._send(body)
+        self.assertEqual(seen['headers']['Content-Encoding'], 'gzip')
+        self.assertEqual(int(seen['headers']['Content-Length']), len(seen['content']))
+        self.assertEqual(gzip.decompress(seen['content']), body)
+    
+    def test_small_body_is_sent_as_is(self):
+        seen = self._send(b"small")
+        self.assertNotIn('Content-Encoding', seen['headers'])
+        self.assertEqual(seen['content'], b"small")
+
+
+class _BreakerModel(model_apis.BaseModelAPI):
+    """Model with the circuit breaker enabled and a scripted call"""
+    
+    retry_delay = 0
+    breaker_max_cooldown = 0.2
+    
+    def __init__(self, base_url):
+        super().__init__(api_key="test", base_url=base_url, breaker_threshold=2)
+    
+    def predict(self, images, prompt, **kwargs):
+        raise NotImplementedError
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    
+    def test_disabled_by_default(self):
+        class _PlainModel(model_apis.BaseModelAPI):
+            def predict(self, images, prompt, **kwargs):
+                raise NotImplementedError
+        
+        self.assertIsNone(_PlainModel(base_url="test://no-breaker")._get_breaker())
+    
+    def test_enabled_per_instance(self):
+        model = model_apis.GPTModelAPI(api_key="test", base_url="test://gpt-breaker", breaker_threshold=5)
+        breaker = model._get_breaker()
+        self.assertIsNotNone(breaker)
+        self.assertEqual(breaker.threshold, 5)
+        
+        # Slotted models accept the setting after construction too (--breaker_threshold)
+        other = model_apis.GPTModelAPI(api_key="test", base_url="test://gpt-breaker")
+        self.assertIsNone(other._get_breaker())
+        other.breaker_threshold = 5
+        self.assertIs(other._get_breaker(), breaker)
+    
+    def test_open_wait_close_cycle(self):
+        model = _BreakerModel("test://breaker-cycle")
+        breaker = model._get_breaker()
+        outcomes = [model_apis.ResponseStatusError(503, "unavailable"),
+                    model_apis.ResponseStatusError(503, "unavailable"),
+                    "Answer: A"]
+        
+        def call():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        
+        start = time.monotonic()
+        result = model._retry_call(call, "Test API")
+        elapsed = time.monotonic() - start
+        
+        # Second failure opens the breaker; the third attempt waits it out
+        # instead of returning an error string, then succeeds and closes it
+        self.assertEqual(result, "Answer: A")
+        self.assertGreaterEqual(elapsed, 0.15)
+        self.assertEqual(breaker.failures, 0)
+        self.assertEqual(breaker.remaining(), 0.0)
+    
+    def test_other_callers_wait_while_open(self):
+        model = _BreakerModel("test://breaker-shared")
+        breaker = model._get_breaker()
+        for _ in range(model.breaker_threshold):
+            breaker.record_failure(model_apis.ResponseStatusError(429, "slow down"))
+        self.assertGreater(breaker.remaining(), 0.0)
+        
+        start = time.monotonic()
+        self.assertEqual(model._retry_call(lambda: "Answer: B", "Test API"), "Answer: B")
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+        self.assertEqual(breaker.remaining(), 0.0)
+
+
+class _EchoModel(model_apis.BaseModelAPI):
+    """Returns the prompt after a prompt-dependent delay; raises for "boom" """
+    
+    def predict(self, images, prompt, **kwargs):
+        if prompt == "boom":
+            raise ValueError("boom")
+        time.sleep(kwargs.get('delays', {}).get(prompt, 0))
+        return f"{prompt}:{len(images)}"
+
+
+class BatchPredictTest(unittest.TestCase):
+    
+    def test_results_keep_input_order(self):
+        model = _EchoModel()
+        # Earlier inputs finish last
+        delays = {"a": 0.06, "b": 0.03, "c": 0.0}
+        inputs = [(["x.png"], "a"), ([], "b"), (["x.png", "y.png"], "c")]
+        
+        self.assertEqual(model.predict_batch(inputs, max_workers=3, delays=delays),
+                         ["a:1", "b:0", "c:2"])
+    
+    def test_empty_inputs(self):
+        self.assertEqual(_EchoModel().predict_batch([]), [])
+    
+    def test_exception_from_one_item_is_raised(self):
+        model = _EchoModel()
+        with self.assertRaises(ValueError):
+            model.predict_batch([([], "a"), ([], "boom"), ([], "c")], max_workers=3)
+
+    
+    def test_apredict_under_gather(self):
+        model = _EchoModel()
+        delays = {"a": 0.1, "b": 0.1, "c": 0.1}
+        
+        async def run():
+            return await asyncio.gather(*(model.apredict([], prompt, delays=delays) for prompt in "abc"))
+        
+        start = time.monotonic()
+        results = asyncio.run(run())
+        elapsed = time.monotonic() - start
+        
+        self.assertEqual(results, ["a:0", "b:0", "c:0"])
+        # The blocking calls overlap in the executor instead of running back to back
+        self.assertLess(elapsed, 0.25)
+    
+    def test_apredict_propagates_exception(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(_EchoModel().apredict([], "boom"))
+
+
+class EncodeDataUrlTest(unittest.TestCase):
+    
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_dir = self._tmp_dir.name
+    
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+    
+    def _encode(self, name, data):
+        image_path = os.path.join(self.tmp_dir, name)
+        Path(image_path).write_bytes(data)
+        return model_apis._encode_file_data_url(image_path, len(data))
+    
+    def test_matches_b64encode_across_chunk_and_mmap_boundaries(self):
+        chunk = model_apis._B64_CHUNK_SIZE
+        mmap_threshold = model_apis._MMAP_THRESHOLD
+        sizes = [0, 1, 2, 3, 10,
+                 chunk - 1, chunk, chunk + 1, 3 * chunk + 2,
+                 mmap_threshold - 1, mmap_threshold, mmap_threshold + 1,
+                 mmap_threshold + chunk + 1]
+        rng = random.Random(0)
+        for size in sizes:
+            # Leading zero byte so no magic number matches; the extension decides
+            data = bytes(1) + rng.getrandbits(8 * size).to_bytes(size, 'little')[1:] if size else b""
+            with self.subTest(size=size):
+                expected = "data:image/png;base64," + base64.b64encode(data).decode('ascii')
+                self.assertEqual(self._encode(f"img_{size}.png", data), expected)
+    
+    def test_magic_bytes_override_extension(self):
+        gif = b"GIF89a" + bytes(100)
+        self.assertTrue(self._encode("really_gif.jpg", gif).startswith("data:image/gif;base64,"))
+        
+        # Large enough for the mmap path
+        jpeg = b"\xff\xd8\xff" + bytes(model_apis._MMAP_THRESHOLD + 10)
+        data_url = self._encode("really_jpeg.png", jpeg)
+        self.assertTrue(data_url.startswith("data:image/jpeg;base64,"))
+        self.assertEqual(base64.b64decode(data_url.split(",", 1)[1]), jpeg)
+        
+        webp = b"RIFF" + bytes(4) + b"WEBP" + bytes(20)
+        self.assertTrue(self._encode("really_webp.png", webp).startswith("data:image/webp;base64,"))
+    
+    def test_unknown_content_and_extension_default_to_png(self):
+        self.assertTrue(self._encode("image.bin", bytes(16)).startswith("data:image/png;base64,"))
+
+
+if __name__ == "__main__":
+    unittest.main()